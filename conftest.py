@@ -1,2 +1,143 @@
+import asyncio
+import socket
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+
+from src.server.oauth import OAuth2Config
+
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
+
 # Ensure pytest-asyncio is always loaded for async test support
 pytest_plugins = ["pytest_asyncio"]
+
+SOLR_ADDRESS = ("localhost", 8983)
+SOLR_PING_URL = "http://localhost:8983/solr/documents/admin/ping"
+
+# Environment variables with OAuth enabled
+OAUTH_ENABLED_ENV = {
+    "ENABLE_OAUTH": "true",
+    "OAUTH_PROVIDER": "keycloak",
+    "KEYCLOAK_URL": "http://localhost:8080",
+    "KEYCLOAK_REALM": "solr-mcp",
+    "KEYCLOAK_CLIENT_ID": "solr-search-server",
+    "KEYCLOAK_CLIENT_SECRET": "test-secret",
+    "OAUTH_SCOPES": "solr:search,solr:read",
+}
+
+
+def _solr_port_open(timeout):
+    """Return True if a TCP connection to the Solr port can be opened."""
+    try:
+        socket.create_connection(SOLR_ADDRESS, timeout=timeout).close()
+    except OSError:
+        return False
+    return True
+
+
+def _solr_available():
+    """Return True if Solr is up and the test collection answers its ping."""
+    # A plain TCP connect fails fast when nothing listens on the Solr port
+    if not _solr_port_open(timeout=0.2):
+        return False
+
+    # Solr is up; make sure the test collection is loaded as well
+    try:
+        response = httpx.get(SOLR_PING_URL, timeout=1.0)
+    except httpx.RequestError:
+        return False
+    return response.status_code == 200
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip all tests marked with 'solr' up front when Solr is not available."""
+    solr_items = [item for item in items if item.get_closest_marker("solr")]
+    if not solr_items or _solr_available():
+        return
+    skip_solr = pytest.mark.skip(reason="Solr server not available")
+    for item in solr_items:
+        item.add_marker(skip_solr)
+
+
+@pytest.fixture(scope="session")
+def event_loop_policy():
+    """Run the async tests on uvloop when it is installed."""
+    if uvloop is not None:
+        return uvloop.EventLoopPolicy()
+    return asyncio.get_event_loop_policy()
+
+
+@pytest.fixture
+def mock_env_oauth_enabled(monkeypatch):
+    """Mock environment variables with OAuth enabled."""
+    for name, value in OAUTH_ENABLED_ENV.items():
+        monkeypatch.setenv(name, value)
+
+
+@pytest.fixture(scope="session")
+def base_oauth_config():
+    """OAuth config with OAuth enabled, loaded from the environment once per session.
+
+    The config is frozen; derive variants with dataclasses.replace().
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        for name, value in OAUTH_ENABLED_ENV.items():
+            mp.setenv(name, value)
+        return OAuth2Config.from_env()
+
+
+def _fake_http_client(response):
+    """Create a minimal async HTTP client stub that records (method, url) calls."""
+    calls = []
+
+    async def get(url, *args, **kwargs):
+        calls.append(("get", url))
+        return response
+
+    async def post(url, *args, **kwargs):
+        calls.append(("post", url))
+        return response
+
+    return SimpleNamespace(get=get, post=post, calls=calls)
+
+
+async def _noop(*args, **kwargs):
+    """Logging stub that discards the message."""
+    return None
+
+
+def _mcp_context(solr_client, oauth_config, token_validator=None, mock_logging=False):
+    """Build a minimal MCP context with the given lifespan dependencies.
+
+    The async logging methods share one no-op coroutine function; pass
+    mock_logging=True to get AsyncMocks that tests can assert on.
+    """
+    lifespan_context = SimpleNamespace(
+        solr_client=solr_client,
+        oauth_config=oauth_config,
+        token_validator=token_validator,
+        server_access_token=None,
+    )
+    context = SimpleNamespace(
+        request_context=SimpleNamespace(lifespan_context=lifespan_context)
+    )
+    for name in ("info", "debug", "warning", "error"):
+        setattr(context, name, AsyncMock() if mock_logging else _noop)
+    return context
+
+
+@pytest.fixture(scope="session")
+def make_fake_client():
+    """Factory for async HTTP client stubs: make_fake_client(response)."""
+    return _fake_http_client
+
+
+@pytest.fixture(scope="session")
+def make_mcp_context():
+    """Factory for MCP test contexts: make_mcp_context(solr_client, oauth_config)."""
+    return _mcp_context
@@ -7,9 +7,22 @@ der verschiedenen Server-Implementierungen.
 """
 import os
 import sys
+import socket
 import argparse
 
 
+# Warteschlange für noch nicht angenommene Verbindungen
+LISTEN_BACKLOG = 2048
+
+# TCP-Keepalive für Client-Verbindungen: erste Probe nach 30 s Leerlauf,
+# danach alle 10 s, Verbindung gilt nach 3 fehlgeschlagenen Proben als tot
+TCP_KEEPALIVE_OPTIONS = {
+    "TCP_KEEPIDLE": 30,
+    "TCP_KEEPINTVL": 10,
+    "TCP_KEEPCNT": 3,
+}
+
+
 def parse_arguments():
     """Parst die Kommandozeilenargumente."""
     parser = argparse.ArgumentParser(
@@ -53,6 +66,35 @@ def print_help():
     print("    python src/main.py --mode http --port 9000\n")
 
 
+def create_listen_socket(host, port):
+    """
+    Erstellt den Listening-Socket für den HTTP-Server mit aktiviertem TCP-Keepalive.
+
+    Akzeptierte Verbindungen erben die Keepalive-Einstellungen, sodass halb
+    offene Client-Verbindungen erkannt und geschlossen werden. Der Socket wird
+    einmal gebunden und an alle Worker weitergegeben, die Verbindungen aus
+    derselben Warteschlange annehmen.
+
+    Args:
+        host (str): Adresse, an die gebunden wird
+        port (int): Port, an den gebunden wird
+
+    Returns:
+        socket.socket: Gebundener und lauschender Socket
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    for name, value in TCP_KEEPALIVE_OPTIONS.items():
+        # Nicht jede Plattform kennt alle Optionen (z.B. macOS ohne TCP_KEEPIDLE)
+        option = getattr(socket, name, None)
+        if option is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, option, value)
+    sock.bind((host, port))
+    sock.listen(LISTEN_BACKLOG)
+    return sock
+
+
 def start_mcp_server(port):
     """Startet den MCP-Protokoll-Server."""
     print(f"\nStarte MCP-Protokoll-Server auf Port {port}...")
@@ -76,11 +118,28 @@ def start_http_server(port):
     try:
         # Wir importieren hier, um Uvicorn in der Funktion zu starten
         import uvicorn
-        from src.server.http_server import app
         
-        print(f"\nHTTP-Server startet auf http://localhost:{port}")
+        workers = int(os.environ.get("MCP_WORKERS", "1"))
+        # Leerlaufende HTTP-Verbindungen offen halten, damit MCP-Clients sie
+        # zwischen zeitlich auseinanderliegenden Tool-Aufrufen wiederverwenden
+        keepalive_timeout = int(os.environ.get("MCP_KEEPALIVE_TIMEOUT", "75"))
+        sock = create_listen_socket("0.0.0.0", port)
+        
+        print(f"\nHTTP-Server startet auf http://localhost:{port} ({workers} Worker)")
         print(f"OpenAPI-Dokumentation: http://localhost:{port}/docs")
-        uvicorn.run(app, host="0.0.0.0", port=port)
+        # Die App wird als Import-String übergeben, damit mehrere Worker möglich sind.
+        # loop/http "auto" wählen uvloop und httptools, sofern installiert
+        # (uvicorn[standard]); Access-Logs sind im Hot-Path deaktiviert.
+        uvicorn.run(
+            "src.server.http_server:app",
+            fd=sock.fileno(),
+            loop="auto",
+            http="auto",
+            workers=workers,
+            log_level="info",
+            access_log=False,
+            timeout_keep_alive=keepalive_timeout,
+        )
     except Exception as e:
         print(f"Fehler beim Starten des HTTP-Servers: {e}")
         sys.exit(1)
@@ -9,11 +9,9 @@ MCP 1.6.0, dass die FastMCP.run()-Methode keinen HTTP-Transport unterstützt.
 import os
 import sys
 import logging
-import traceback
 from typing import Dict, List, Optional, Any
 from pathlib import Path
 
-import httpx
 import uvicorn
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, Request
@@ -29,6 +27,7 @@ if project_dir not in sys.path:
 # Importiere lokale Module
 from src.server.models import SearchParams, GetDocumentParams, ErrorResponse
 from src.server.solr_client import SolrClient
+from src.utils.log import log_error
 
 # Logger für diese Datei konfigurieren
 logging.basicConfig(
@@ -74,16 +73,19 @@ async def startup_event():
     # Teste die Solr-Verbindung
     try:
         logger.info("Teste Solr-Verbindung...")
-        async with httpx.AsyncClient() as client:
-            ping_url = f"{SOLR_BASE_URL}/{SOLR_COLLECTION}/admin/ping"
-            response = await client.get(ping_url)
-            response.raise_for_status()
-            logger.info("Solr-Verbindung erfolgreich")
+        await solr_client.ping()
+        logger.info("Solr-Verbindung erfolgreich")
     except Exception as e:
         logger.warning(f"Solr-Verbindungstest fehlgeschlagen: {e}")
         logger.warning("Server wird gestartet, aber Solr-Suchen könnten fehlschlagen")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Schließt die gepoolten Verbindungen des Solr-Clients."""
+    await solr_client.aclose()
+
+
 # Server-Info-Endpunkt (imitiert den MCP-Server-Info-Endpunkt)
 @app.get("/server_info")
 async def server_info():
@@ -141,8 +143,7 @@ async def tool_search(params: SearchParams):
         )
         return results
     except Exception as e:
-        logger.error(f"Fehler im Such-Tool: {e}")
-        logger.error(traceback.format_exc())
+        log_error(logger, f"Fehler im Such-Tool: {e}")
         raise HTTPException(status_code=500, detail=f"Fehler bei der Verarbeitung der Suche: {str(e)}")
 
 
@@ -174,8 +175,7 @@ async def tool_get_document(params: GetDocumentParams):
         # Bereits formatierte HTTPException weiterleiten
         raise
     except Exception as e:
-        logger.error(f"Fehler beim Dokumentenabruf: {e}")
-        logger.error(traceback.format_exc())
+        log_error(logger, f"Fehler beim Dokumentenabruf: {e}")
         raise HTTPException(status_code=500, detail=f"Fehler beim Abrufen des Dokuments: {str(e)}")
 
 
@@ -196,8 +196,7 @@ async def resource_search(query: str):
         results = await solr_client.search(query=query)
         return results
     except Exception as e:
-        logger.error(f"Fehler in der Such-Resource: {e}")
-        logger.error(traceback.format_exc())
+        log_error(logger, f"Fehler in der Such-Resource: {e}")
         raise HTTPException(status_code=500, detail=f"Fehler bei der Verarbeitung der Suche: {str(e)}")
 
 
@@ -216,8 +215,7 @@ async def resource_fallback(path: str, request: Request):
         else:
             return {"error": f"Nicht unterstützter Resource-Pfad: {path}"}
     except Exception as e:
-        logger.error(f"Fehler im Resource-Fallback: {e}")
-        logger.error(traceback.format_exc())
+        log_error(logger, f"Fehler im Resource-Fallback: {e}")
         raise HTTPException(status_code=500, detail=f"Fehler bei der Verarbeitung der Resource: {str(e)}")
 
 
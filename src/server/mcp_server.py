@@ -6,17 +6,16 @@ Diese Implementierung stellt MCP-Ressourcen und -Tools für die Solr-Integration
 optimiert für die Verwendung mit dem MCP-Protokoll durch LLMs.
 """
 import os
-import json
 import sys
 import logging
-import traceback
 import asyncio
-from typing import Dict, List, Optional, Any, AsyncIterator
+import time
+from typing import Dict, List, Optional, Any, AsyncIterator, Tuple
 from pathlib import Path
 from contextlib import asynccontextmanager
 from dataclasses import dataclass
 
-import httpx
+import orjson
 from dotenv import load_dotenv
 from mcp.server.fastmcp import FastMCP, Context
 
@@ -32,6 +31,7 @@ if project_dir not in sys.path:
 # Importiere lokale Module
 from src.server.models import SearchParams, GetDocumentParams
 from src.server.solr_client import SolrClient
+from src.utils.log import log_error
 from src.server.oauth import (
     OAuth2Config,
     TokenValidator,
@@ -50,19 +50,51 @@ logger = logging.getLogger("mcp-server")
 # Umgebungsvariablen laden
 load_dotenv()
 
-# MCP-Server-Konfiguration
-MCP_SERVER_NAME = os.getenv("MCP_SERVER_NAME", "Solr Search")
-MCP_SERVER_PORT = int(os.getenv("MCP_SERVER_PORT", "8765"))
 
-# Solr-Verbindungskonfiguration
-SOLR_BASE_URL = os.getenv("SOLR_BASE_URL", "http://localhost:8983/solr")
-SOLR_COLLECTION = os.getenv("SOLR_COLLECTION", "documents")
-SOLR_USERNAME = os.getenv("SOLR_USERNAME", "")
-SOLR_PASSWORD = os.getenv("SOLR_PASSWORD", "")
+@dataclass(frozen=True, slots=True)
+class ServerConfig:
+    """Unveränderliche Server-Konfiguration, einmalig beim Import gelesen."""
+
+    server_name: str
+    server_port: int
+    # Eingerücktes JSON nur im Debug-Modus, sonst kompakte Ausgabe
+    debug: bool
+    solr_base_url: str
+    solr_collection: str
+    solr_username: str
+    solr_password: str
+    solr_http2: bool
+    # Gültigkeit des Suchantwort-Caches in Sekunden, 0 = deaktiviert
+    solr_search_cache_ttl: float
+
+    @classmethod
+    def from_env(cls) -> "ServerConfig":
+        """Create server configuration from environment variables."""
+        return cls(
+            server_name=os.getenv("MCP_SERVER_NAME", "Solr Search"),
+            server_port=int(os.getenv("MCP_SERVER_PORT", "8765")),
+            debug=os.getenv("MCP_DEBUG", "").lower() in ("1", "true"),
+            solr_base_url=os.getenv("SOLR_BASE_URL", "http://localhost:8983/solr"),
+            solr_collection=os.getenv("SOLR_COLLECTION", "documents"),
+            solr_username=os.getenv("SOLR_USERNAME", ""),
+            solr_password=os.getenv("SOLR_PASSWORD", ""),
+            solr_http2=os.getenv("SOLR_HTTP2", "false").lower() == "true",
+            solr_search_cache_ttl=float(os.getenv("SOLR_SEARCH_CACHE_TTL", "0")),
+        )
+
+
+# MCP-Server- und Solr-Verbindungskonfiguration
+CONFIG = ServerConfig.from_env()
+JSON_OPTIONS = orjson.OPT_INDENT_2 if CONFIG.debug else 0
 
 # Global app context for token refresh background task
 app_context: Optional["AppContext"] = None
 
+# Cache für Solr-Ping-Ergebnisse je Ping-URL: (Zeitstempel, Ergebnis)
+PING_TTL = 5.0  # Sekunden
+_ping_cache: Dict[str, Tuple[float, bool]] = {}
+_ping_lock = asyncio.Lock()
+
 
 @dataclass
 class AppContext:
@@ -149,10 +181,12 @@ async def lifespan(server: FastMCP) -> AsyncIterator[AppContext]:
 
     # Initialize Solr client during startup
     solr_client = SolrClient(
-        base_url=SOLR_BASE_URL,
-        collection=SOLR_COLLECTION,
-        username=SOLR_USERNAME,
-        password=SOLR_PASSWORD,
+        base_url=CONFIG.solr_base_url,
+        collection=CONFIG.solr_collection,
+        username=CONFIG.solr_username,
+        password=CONFIG.solr_password,
+        http2=CONFIG.solr_http2,
+        search_cache_ttl=CONFIG.solr_search_cache_ttl,
     )
     logger.info("Solr client initialized")
 
@@ -163,7 +197,9 @@ async def lifespan(server: FastMCP) -> AsyncIterator[AppContext]:
             f"OAuth 2.1 enabled with provider: {oauth_config.provider} "
             f"(realm: {oauth_config.realm})"
         )
-        logger.info(f"Required scopes: {oauth_config.required_scopes}")
+        logger.info(
+            f"Required scopes: {', '.join(sorted(oauth_config.required_scopes))}"
+        )
         if oauth_config.auto_refresh:
             logger.info(f"OAuth auto-refresh enabled for user: {oauth_config.username}")
     else:
@@ -254,9 +290,12 @@ async def lifespan(server: FastMCP) -> AsyncIterator[AppContext]:
         if token_validator and token_validator._http_client:
             await token_validator._http_client.aclose()
 
+        # Close the Solr connection pool
+        await solr_client.aclose()
+
 
 # MCP-Server with modern lifespan management
-app = FastMCP(MCP_SERVER_NAME, lifespan=lifespan)
+app = FastMCP(CONFIG.server_name, lifespan=lifespan)
 
 
 async def validate_oauth_token(
@@ -307,7 +346,7 @@ async def validate_oauth_token(
 
     # Check scopes
     if not app_context.token_validator.check_scopes(token_data):
-        required = app_context.oauth_config.required_scopes
+        required = ", ".join(sorted(app_context.oauth_config.required_scopes))
         raise InsufficientScopesError(
             f"Token missing required scopes. Required: {required}"
         )
@@ -322,23 +361,19 @@ async def validate_oauth_token(
     return token_data
 
 
-@app.resource("solr://search/{query}")
-async def search_solr(ctx: Context, query: str) -> str:
+async def _search_solr_dict(ctx: Context, query: str) -> Dict[str, Any]:
     """
-    Einfache Ressource für die Suche in Solr-Dokumenten.
+    Führt die Suche der search_solr-Ressource aus und liefert das Ergebnis als Dict.
 
-    Diese Ressource bietet eine einfache Schnittstelle für Solr-Suchen
-    über den MCP-Protokoll-Ressourcenmechanismus.
-
-    Note: This resource does not support OAuth authentication. For OAuth-protected
-    access, use the 'search' tool instead.
+    Aufrufer, die das Ergebnis direkt weiterverarbeiten, sparen sich so das
+    Kodieren und erneute Parsen des JSON-Strings.
 
     Args:
         ctx (Context): MCP context with access to lifespan context
         query (str): Die Suchanfrage
 
     Returns:
-        str: JSON-String mit Suchergebnissen
+        Dict[str, Any]: Suchergebnisse oder Fehlermeldung
     """
     try:
         # Check if OAuth is enabled - if so, recommend using the tool instead
@@ -351,14 +386,32 @@ async def search_solr(ctx: Context, query: str) -> str:
 
         await ctx.info(f"Verarbeite Suchanfrage mit Query: {query}")
         solr_client = ctx.request_context.lifespan_context.solr_client
-        results = await solr_client.search(query)
-        return json.dumps(results, indent=2)
+        return await solr_client.search(query)
     except Exception as e:
-        logger.error(f"Fehler in search_solr-Ressource: {e}")
-        logger.error(traceback.format_exc())
-        return json.dumps(
-            {"error": f"Fehler bei der Verarbeitung der Suche: {str(e)}"}, indent=2
-        )
+        log_error(logger, f"Fehler in search_solr-Ressource: {e}")
+        return {"error": f"Fehler bei der Verarbeitung der Suche: {str(e)}"}
+
+
+@app.resource("solr://search/{query}")
+async def search_solr(ctx: Context, query: str) -> str:
+    """
+    Einfache Ressource für die Suche in Solr-Dokumenten.
+
+    Diese Ressource bietet eine einfache Schnittstelle für Solr-Suchen
+    über den MCP-Protokoll-Ressourcenmechanismus.
+
+    Note: This resource does not support OAuth authentication. For OAuth-protected
+    access, use the 'search' tool instead.
+
+    Args:
+        ctx (Context): MCP context with access to lifespan context
+        query (str): Die Suchanfrage
+
+    Returns:
+        str: JSON-String mit Suchergebnissen
+    """
+    results = await _search_solr_dict(ctx, query)
+    return orjson.dumps(results, option=JSON_OPTIONS).decode()
 
 
 @app.tool(
@@ -427,8 +480,7 @@ async def search(
 
         return results
     except Exception as e:
-        logger.error(f"Fehler im search-Tool: {e}")
-        logger.error(traceback.format_exc())
+        log_error(logger, f"Fehler im search-Tool: {e}")
         return {"error": f"Fehler bei der Verarbeitung der Suche: {str(e)}"}
 
 
@@ -474,8 +526,7 @@ async def get_document(
 
         return document
     except Exception as e:
-        logger.error(f"Fehler im get_document-Tool: {e}")
-        logger.error(traceback.format_exc())
+        log_error(logger, f"Fehler im get_document-Tool: {e}")
         return {"error": f"Fehler beim Abrufen des Dokuments: {str(e)}"}
 
 
@@ -483,29 +534,46 @@ async def test_solr_connection(solr_client: SolrClient):
     """
     Testet die Verbindung zum Solr-Server vor dem Start des MCP-Servers.
 
+    Das Ergebnis wird je Ping-URL für PING_TTL Sekunden zwischengespeichert.
+    Gleichzeitige Aufrufe warten auf denselben Ping, sodass Solr nur einmal
+    angefragt wird.
+
     Args:
         solr_client (SolrClient): The Solr client instance to test
 
     Returns:
         bool: True, wenn die Verbindung erfolgreich war, sonst False
     """
-    try:
-        logger.info("Teste Solr-Verbindung...")
-        async with httpx.AsyncClient() as client:
-            ping_url = f"{solr_client.base_url}/{solr_client.collection}/admin/ping"
-            response = await client.get(ping_url)
-            response.raise_for_status()
+    ping_url = solr_client._ping_url
+    cached = _ping_cache.get(ping_url)
+    if cached and time.monotonic() - cached[0] < PING_TTL:
+        return cached[1]
+
+    async with _ping_lock:
+        # Ein paralleler Aufruf hat den Cache eventuell bereits aktualisiert
+        cached = _ping_cache.get(ping_url)
+        if cached and time.monotonic() - cached[0] < PING_TTL:
+            return cached[1]
+
+        try:
+            logger.info("Teste Solr-Verbindung...")
+            await solr_client.ping()
             logger.info("Solr-Verbindung erfolgreich")
-        return True
-    except Exception as e:
-        logger.warning(f"Solr-Verbindungstest fehlgeschlagen: {e}")
-        logger.warning("Server wird gestartet, aber Solr-Suchen könnten fehlschlagen")
-        return False
+            result = True
+        except Exception as e:
+            logger.warning(f"Solr-Verbindungstest fehlgeschlagen: {e}")
+            logger.warning(
+                "Server wird gestartet, aber Solr-Suchen könnten fehlschlagen"
+            )
+            result = False
+
+        _ping_cache[ping_url] = (time.monotonic(), result)
+        return result
 
 
 if __name__ == "__main__":
     # Umgebungsvariablen für den MCP-Server setzen
-    os.environ["MCP_PORT"] = str(MCP_SERVER_PORT)
+    os.environ["MCP_PORT"] = str(CONFIG.server_port)
 
     import asyncio
 
@@ -514,7 +582,7 @@ if __name__ == "__main__":
     try:
         # Server starten mit modernem FastMCP
         logger.info(
-            f"Starte MCP-Server '{MCP_SERVER_NAME}' auf Port {MCP_SERVER_PORT}..."
+            f"Starte MCP-Server '{CONFIG.server_name}' auf Port {CONFIG.server_port}..."
         )
         print(
             f"MCP-Server wird gestartet, nutze 'mcp dev {__file__}' für die Entwicklungsumgebung"
@@ -530,5 +598,4 @@ if __name__ == "__main__":
         else:
             app.run(transport="stdio")
     except Exception as e:
-        logger.error(f"Fehler beim Starten des Servers: {e}")
-        logger.error(traceback.format_exc())
+        log_error(logger, f"Fehler beim Starten des Servers: {e}")
@@ -5,11 +5,14 @@ OAuth 2.1 authentication and authorization for MCP Server.
 This module provides OAuth token validation using Keycloak as the identity provider,
 following the MCP Specification 2025-06-18.
 """
+
 import os
+import copy
+import time
+import hashlib
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, FrozenSet, Tuple
 from dataclasses import dataclass
-from datetime import datetime, timedelta
 
 import httpx
 from jose import jwt, JWTError, jwk
@@ -17,8 +20,19 @@ from jose.exceptions import ExpiredSignatureError, JWTClaimsError
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of locally validated tokens kept in the TokenValidator cache
+TOKEN_CACHE_MAX_SIZE = 1024
+
+# Lifetime of the cached JWKS in seconds
+JWKS_CACHE_TTL = 3600
+
 
-@dataclass
+def _format_scopes(scopes) -> str:
+    """Format a set of scopes as a stable, readable comma-separated list."""
+    return ", ".join(sorted(scopes))
+
+
+@dataclass(frozen=True, slots=True)
 class OAuth2Config:
     """OAuth 2.1 configuration for Keycloak integration."""
 
@@ -28,7 +42,7 @@ class OAuth2Config:
     realm: str
     client_id: str
     client_secret: str
-    required_scopes: List[str]
+    required_scopes: FrozenSet[str]
     token_validation_endpoint: str
     jwks_endpoint: str
     # Server-side token retrieval (optional)
@@ -37,6 +51,10 @@ class OAuth2Config:
     password: str = ""
     token_endpoint: str = ""
 
+    def __post_init__(self):
+        """Store required scopes as a frozenset for fast subset checks."""
+        object.__setattr__(self, "required_scopes", frozenset(self.required_scopes))
+
     @classmethod
     def from_env(cls) -> "OAuth2Config":
         """Create OAuth configuration from environment variables."""
@@ -49,7 +67,9 @@ class OAuth2Config:
 
         # Parse scopes from comma-separated list
         scopes_str = os.getenv("OAUTH_SCOPES", "solr:search,solr:read")
-        required_scopes = [s.strip() for s in scopes_str.split(",") if s.strip()]
+        required_scopes = frozenset(
+            s.strip() for s in scopes_str.split(",") if s.strip()
+        )
 
         # Server-side token retrieval
         auto_refresh = os.getenv("OAUTH_AUTO_REFRESH", "false").lower() == "true"
@@ -89,27 +109,37 @@ class TokenValidator:
     2. Remote token introspection via Keycloak API (authoritative)
     """
 
-    def __init__(self, config: OAuth2Config):
+    def __init__(
+        self, config: OAuth2Config, http_client: Optional[httpx.AsyncClient] = None
+    ):
         """
         Initialize the token validator.
 
         Args:
             config: OAuth 2.1 configuration
+            http_client: Optional shared HTTP client. It is used as-is and not
+                closed by the validator; without it, the validator creates and
+                closes its own client.
         """
         self.config = config
         self._jwks_cache: Optional[Dict[str, Any]] = None
-        self._jwks_cache_expires: Optional[datetime] = None
-        self._http_client: Optional[httpx.AsyncClient] = None
+        self._jwks_cache_expires: float = 0.0
+        self._http_client: Optional[httpx.AsyncClient] = http_client
+        self._owns_http_client = http_client is None
+        # Locally validated tokens: sha256(token) -> (exp, claims)
+        self._token_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
 
     async def __aenter__(self):
         """Async context manager entry."""
-        self._http_client = httpx.AsyncClient()
+        if self._owns_http_client:
+            self._http_client = httpx.AsyncClient()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit."""
-        if self._http_client:
+        if self._owns_http_client and self._http_client:
             await self._http_client.aclose()
+            self._http_client = None
 
     async def _fetch_jwks(self) -> Dict[str, Any]:
         """
@@ -124,11 +154,7 @@ class TokenValidator:
             Exception: If JWKS fetch fails
         """
         # Check cache
-        if (
-            self._jwks_cache
-            and self._jwks_cache_expires
-            and datetime.utcnow() < self._jwks_cache_expires
-        ):
+        if self._jwks_cache and time.time() < self._jwks_cache_expires:
             return self._jwks_cache
 
         # Fetch from Keycloak
@@ -143,7 +169,7 @@ class TokenValidator:
 
             # Cache for 1 hour
             self._jwks_cache = jwks_data
-            self._jwks_cache_expires = datetime.utcnow() + timedelta(hours=1)
+            self._jwks_cache_expires = time.time() + JWKS_CACHE_TTL
 
             logger.info("JWKS fetched and cached successfully")
             return jwks_data
@@ -257,6 +283,10 @@ class TokenValidator:
         """
         Validate access token using the configured method.
 
+        Tokens validated locally via JWKS are cached until their ``exp`` claim,
+        so repeated requests with the same token skip the signature check.
+        Introspection is never cached, so revoked tokens are always detected.
+
         Args:
             token: JWT access token from Authorization header
             use_introspection: If True, use introspection endpoint (slower but authoritative)
@@ -272,10 +302,32 @@ class TokenValidator:
             logger.warning("OAuth is disabled, skipping token validation")
             return {"sub": "anonymous", "scope": "all"}
 
+        # Introspection must reach Keycloak every time to notice revoked tokens
         if use_introspection:
             return await self.validate_token_introspection(token)
-        else:
-            return await self.validate_token_local(token)
+
+        # Return a deep copy of the cached claims for a token that was already
+        # validated locally and is not yet expired; nested claims such as
+        # realm_access must not be shared with callers
+        cache_key = hashlib.sha256(token.encode()).hexdigest()
+        cached = self._token_cache.get(cache_key)
+        if cached:
+            expires_at, claims = cached
+            if expires_at > time.time():
+                return copy.deepcopy(claims)
+            del self._token_cache[cache_key]
+
+        claims = await self.validate_token_local(token)
+
+        # Only successfully validated tokens with an expiry are cached
+        expires_at = claims.get("exp")
+        if expires_at:
+            if len(self._token_cache) >= TOKEN_CACHE_MAX_SIZE:
+                # Evict the oldest entry (dicts keep insertion order)
+                del self._token_cache[next(iter(self._token_cache))]
+            self._token_cache[cache_key] = (float(expires_at), copy.deepcopy(claims))
+
+        return claims
 
     async def retrieve_token(self, username: str, password: str) -> Dict[str, Any]:
         """
@@ -305,7 +357,7 @@ class TokenValidator:
                 "username": username,
                 "password": password,
                 "grant_type": "password",
-                "scope": " ".join(self.config.required_scopes),
+                "scope": " ".join(sorted(self.config.required_scopes)),
             }
 
             logger.info(
@@ -398,25 +450,27 @@ class TokenValidator:
         # Extract scopes from token
         token_scope = token_data.get("scope", "")
         if isinstance(token_scope, str):
-            token_scopes = set(token_scope.split())
+            token_scopes = frozenset(token_scope.split())
         elif isinstance(token_scope, list):
-            token_scopes = set(token_scope)
+            token_scopes = frozenset(token_scope)
         else:
-            token_scopes = set()
+            token_scopes = frozenset()
 
         # Check if all required scopes are present
-        required_scopes = set(self.config.required_scopes)
-        missing_scopes = required_scopes - token_scopes
-
-        if missing_scopes:
-            logger.warning(
-                f"Token missing required scopes: {missing_scopes}. "
-                f"Has: {token_scopes}, Requires: {required_scopes}"
+        required_scopes = self.config.required_scopes
+        if required_scopes.issubset(token_scopes):
+            logger.debug(
+                f"Token has all required scopes: {_format_scopes(required_scopes)}"
             )
-            return False
+            return True
 
-        logger.debug(f"Token has all required scopes: {required_scopes}")
-        return True
+        logger.warning(
+            "Token missing required scopes: "
+            f"{_format_scopes(required_scopes - token_scopes)}. "
+            f"Has: {_format_scopes(token_scopes)}, "
+            f"Requires: {_format_scopes(required_scopes)}"
+        )
+        return False
 
 
 class OAuthError(Exception):
@@ -5,18 +5,39 @@ SolrClient für die Kommunikation mit Apache Solr.
 Diese Klasse bietet asynchrone Methoden für Suche und Dokumentenabruf von Solr-Servern.
 """
 import logging
-import traceback
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Tuple
+from dataclasses import dataclass, field
+from urllib.parse import urlencode
 import inspect
 
 import httpx
+import orjson
+
+from src.utils.log import log_error
 
 # Logger für diese Datei konfigurieren
 logger = logging.getLogger("solr-client")
 
+# Konstante Query-Parameter werden einmalig URL-kodiert und an jede Anfrage angehängt
+_CONST_QS = urlencode({"wt": "json"})
+
+# edismax-Parameter für die Multi-Field-Suche:
+# title^2 bedeutet, dass title doppelt so stark gewichtet wird;
+# mm=75% - mindestens 75% der Suchbegriffe müssen übereinstimmen
+EDISMAX_QF = "title^2 content^1.5 author category"
+_EDISMAX_QS = urlencode({"defType": "edismax", "qf": EDISMAX_QF, "mm": "75%"})
+
+# Verbindungslimits und Timeout (Sekunden) für Anfragen an Solr
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=100)
+HTTP_TIMEOUT = 10.0
+
+# Maximale Anzahl zwischengespeicherter Suchantworten pro Client
+SEARCH_CACHE_MAX_SIZE = 1024
 
-@dataclass
+
+@dataclass(slots=True)
 class SolrClient:
     """Client für die Kommunikation mit Apache Solr.
 
@@ -28,12 +49,78 @@ class SolrClient:
         collection (str): Name der Solr-Kollektion für Suchabfragen
         username (Optional[str]): Benutzername für die Solr-Authentifizierung
         password (Optional[str]): Passwort für die Solr-Authentifizierung
+        http2 (bool): HTTP/2 für Anfragen an Solr verwenden (benötigt ``httpx[http2]``)
+        search_cache_ttl (float): Sekunden, die identische Suchantworten
+            zwischengespeichert werden; 0 deaktiviert den Cache (Standard)
     """
 
     base_url: str
     collection: str
     username: Optional[str] = None
     password: Optional[str] = None
+    http2: bool = False
+    search_cache_ttl: float = 0.0
+    _select_url: str = field(init=False, repr=False)
+    _ping_url: str = field(init=False, repr=False)
+    _http_client: Optional[httpx.AsyncClient] = field(
+        default=None, init=False, repr=False
+    )
+    # Query-String -> (Zeitpunkt, rohe Solr-Antwort), älteste Einträge zuerst
+    _search_cache: "OrderedDict[str, Tuple[float, bytes]]" = field(
+        default_factory=OrderedDict, init=False, repr=False
+    )
+
+    def __post_init__(self):
+        """Berechnet die Solr-Endpunkt-URLs einmalig bei der Initialisierung."""
+        collection_url = f"{self.base_url.rstrip('/')}/{self.collection}"
+        self._select_url = f"{collection_url}/select"
+        self._ping_url = f"{collection_url}/admin/ping"
+
+    async def __aenter__(self) -> "SolrClient":
+        """Async context manager entry."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Async context manager exit."""
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Schließt den HTTP-Client und gibt die gepoolten Verbindungen frei."""
+        if self._http_client:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    def _create_http_client(self) -> httpx.AsyncClient:
+        """Erstellt einen HTTP-Client mit den konfigurierten Limits für Solr."""
+        return httpx.AsyncClient(
+            http2=self.http2, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT
+        )
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Liefert den gemeinsamen HTTP-Client; er wird beim ersten Aufruf erstellt.
+
+        Alle Anfragen teilen sich so einen Verbindungspool mit Keep-Alive.
+        """
+        if self._http_client is None:
+            self._http_client = self._create_http_client()
+        return self._http_client
+
+    async def ping(self) -> None:
+        """Prüft über den Ping-Endpunkt, ob die Kollektion erreichbar ist.
+
+        Der Ping nutzt den gemeinsamen HTTP-Client, sodass die Verbindung
+        anschließend für Suchanfragen wiederverwendet werden kann.
+
+        Raises:
+            httpx.HTTPError: Wenn Solr nicht erreichbar ist oder einen Fehler meldet
+        """
+        auth = None
+        if self.username and self.password:
+            auth = (self.username, self.password)
+
+        client = self._get_http_client()
+        response = await client.get(self._ping_url, auth=auth)
+        response.raise_for_status()
 
     async def search(
         self,
@@ -62,19 +149,13 @@ class SolrClient:
         """
         params = {
             "q": query or "*:*",
-            "wt": "json",
             "rows": rows,
             "start": start,
         }
 
         # Use edismax query parser for better multi-field search
         # Only for non-field-specific queries (no colons in query)
-        if query != "*:*" and ":" not in query:
-            params["defType"] = "edismax"
-            # Query fields with boost factors: title^2 means title is 2x more important
-            params["qf"] = "title^2 content^1.5 author category"
-            # Minimum should match - at least 75% of terms should match
-            params["mm"] = "75%"
+        use_edismax = query != "*:*" and ":" not in query
 
         # Füge optionale Parameter hinzu, wenn sie vorhanden sind
         if filter_query:
@@ -96,34 +177,54 @@ class SolrClient:
             params["hl.snippets"] = 3  # Max. 3 Snippets pro Feld
             params["hl.fragsize"] = 150  # 150 Zeichen pro Fragment
 
+        # Nur die variablen Parameter werden pro Anfrage kodiert
+        query_string = f"{urlencode(params, doseq=True)}&{_CONST_QS}"
+        if use_edismax:
+            query_string = f"{query_string}&{_EDISMAX_QS}"
+
         auth = None
         if self.username and self.password:
             auth = (self.username, self.password)
 
-        url = f"{self.base_url}/{self.collection}/select"
+        # Identische Anfragen werden für search_cache_ttl Sekunden aus dem Cache bedient
+        use_cache = self.search_cache_ttl > 0
+        if use_cache:
+            cached = self._search_cache.get(query_string)
+            if cached and time.monotonic() - cached[0] < self.search_cache_ttl:
+                self._search_cache.move_to_end(query_string)
+                return orjson.loads(cached[1])
+
+        url = self._select_url
 
         try:
             logger.info(f"Sende Solr-Suchanfrage an {url} mit Query: {query}")
-            if params.get("defType") == "edismax":
-                logger.info(f"Verwende edismax mit qf: {params['qf']}")
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params, auth=auth)
-                if inspect.iscoroutinefunction(response.raise_for_status):
-                    await response.raise_for_status()
-                else:
-                    response.raise_for_status()
-                if inspect.iscoroutinefunction(response.json):
-                    return await response.json()
-                else:
-                    return response.json()
+            if use_edismax:
+                logger.info(f"Verwende edismax mit qf: {EDISMAX_QF}")
+            client = self._get_http_client()
+            response = await client.get(f"{url}?{query_string}", auth=auth)
+            if inspect.iscoroutinefunction(response.raise_for_status):
+                await response.raise_for_status()
+            else:
+                response.raise_for_status()
+            body = await response.aread()
+            result = orjson.loads(body)
+            if use_cache:
+                self._cache_search_response(query_string, body)
+            return result
         except httpx.HTTPStatusError:
             # Fehler nicht abfangen, sondern durchreichen
             raise
         except Exception as e:
-            logger.error(f"Fehler bei der Solr-Suche: {e}")
-            logger.error(traceback.format_exc())
+            log_error(logger, f"Fehler bei der Solr-Suche: {e}")
             return {"error": f"Fehler bei der Suche: {str(e)}"}
 
+    def _cache_search_response(self, query_string: str, body: bytes) -> None:
+        """Speichert eine Suchantwort und verdrängt bei Bedarf den ältesten Eintrag."""
+        self._search_cache[query_string] = (time.monotonic(), body)
+        self._search_cache.move_to_end(query_string)
+        if len(self._search_cache) > SEARCH_CACHE_MAX_SIZE:
+            self._search_cache.popitem(last=False)
+
     async def get_document(
         self, doc_id: str, fields: Optional[List[str]] = None
     ) -> Dict[str, Any]:
@@ -137,39 +238,34 @@ class SolrClient:
         Returns:
             Dict[str, Any]: Das abgerufene Dokument oder eine Fehlermeldung
         """
-        params = {
-            "q": f"id:{doc_id}",
-            "wt": "json",
-        }
+        params = {"q": f"id:{doc_id}"}
 
         if fields:
             params["fl"] = ",".join(fields)
 
+        query_string = f"{urlencode(params)}&{_CONST_QS}"
+
         auth = None
         if self.username and self.password:
             auth = (self.username, self.password)
 
-        url = f"{self.base_url}/{self.collection}/select"
+        url = self._select_url
 
         try:
             logger.info(f"Rufe Dokument mit ID {doc_id} von {url} ab")
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params, auth=auth)
-                if inspect.iscoroutinefunction(response.raise_for_status):
-                    await response.raise_for_status()
-                else:
-                    response.raise_for_status()
-                if inspect.iscoroutinefunction(response.json):
-                    result = await response.json()
-                else:
-                    result = response.json()
-                if result["response"]["numFound"] == 0:
-                    return {"error": f"Dokument mit ID {doc_id} nicht gefunden"}
-                return result["response"]["docs"][0]
+            client = self._get_http_client()
+            response = await client.get(f"{url}?{query_string}", auth=auth)
+            if inspect.iscoroutinefunction(response.raise_for_status):
+                await response.raise_for_status()
+            else:
+                response.raise_for_status()
+            result = orjson.loads(await response.aread())
+            if result["response"]["numFound"] == 0:
+                return {"error": f"Dokument mit ID {doc_id} nicht gefunden"}
+            return result["response"]["docs"][0]
         except httpx.HTTPStatusError:
             # Fehler nicht abfangen, sondern durchreichen
             raise
         except Exception as e:
-            logger.error(f"Fehler beim Abrufen des Dokuments: {e}")
-            logger.error(traceback.format_exc())
+            log_error(logger, f"Fehler beim Abrufen des Dokuments: {e}")
             return {"error": f"Fehler beim Abrufen des Dokuments: {str(e)}"}
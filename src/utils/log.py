@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Logging-Hilfsfunktionen für die Server-Module.
+"""
+import logging
+
+
+def log_error(logger: logging.Logger, msg: str) -> None:
+    """
+    Protokolliert einen Fehler; den Traceback nur, wenn DEBUG aktiv ist.
+
+    Muss innerhalb eines ``except``-Blocks aufgerufen werden. Der Traceback wird
+    über ``exc_info`` erst vom Handler formatiert, statt bei jedem Fehler
+    ``traceback.format_exc()`` auszuführen.
+
+    Args:
+        logger: Logger, über den protokolliert wird
+        msg: Fehlermeldung
+    """
+    logger.error(msg)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Traceback:", exc_info=True)
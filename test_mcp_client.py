@@ -2,39 +2,42 @@ import asyncio
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 
+# Maximale Anzahl an Dokumenten, die nach der Suche parallel abgerufen werden
+MAX_DOCUMENTS = 5
+
 async def main():
     server_params = StdioServerParameters(
         command="mcp",
         args=["run", "src/server/mcp_server.py"],
     )
-    
+
     async with stdio_client(server_params) as (read, write):
         async with ClientSession(read, write) as session:
             await session.initialize()
-            
+
             # Liste der verfügbaren Tools anzeigen
             tools = await session.list_tools()
             print("Verfügbare Tools:", tools)
-            
+
             # Eine Suche durchführen
             result = await session.call_tool("search", {
-                "params": {
-                    "query": "beispiel", 
-                    "rows": 5
-                }
+                "query": "beispiel",
+                "rows": MAX_DOCUMENTS
             })
             print("Suchergebnisse:", result)
-            
-            # Ein Dokument abrufen (vorausgesetzt, die ID existiert)
-            try:
-                doc_result = await session.call_tool("get_document", {
-                    "params": {
-                        "id": "doc1"
-                    }
-                })
-                print("Abgerufenes Dokument:", doc_result)
-            except Exception as e:
-                print(f"Fehler beim Abrufen des Dokuments: {e}")
+
+            # Alle gefundenen Dokumente gleichzeitig über dieselbe Session abrufen
+            search_result = result.structuredContent or {}
+            docs = search_result.get("response", {}).get("docs", [])[:MAX_DOCUMENTS]
+            doc_results = await asyncio.gather(
+                *(session.call_tool("get_document", {"id": doc["id"]}) for doc in docs),
+                return_exceptions=True,
+            )
+            for doc, doc_result in zip(docs, doc_results):
+                if isinstance(doc_result, Exception):
+                    print(f"Fehler beim Abrufen des Dokuments {doc['id']}: {doc_result}")
+                else:
+                    print("Abgerufenes Dokument:", doc_result)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -6,11 +6,12 @@ This version bypasses the FastMCP run() method limitations by accessing the
 underlying ASGI app and serving it with Uvicorn directly for HTTP access.
 """
 import os
+import sys
 import json
 import logging
-import traceback
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
+from pathlib import Path
 
 import httpx
 import uvicorn
@@ -18,6 +19,13 @@ from dotenv import load_dotenv
 from mcp.server.fastmcp import FastMCP
 from pydantic import BaseModel, Field
 
+# Add the project root to the system path so the shared src helpers can be imported
+project_dir = str(Path(__file__).parents[2])  # tests/archived -> tests -> project root
+if project_dir not in sys.path:
+    sys.path.insert(0, project_dir)
+
+from src.utils.log import log_error
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -77,13 +85,12 @@ class SolrClient:
                 response.raise_for_status()
                 return response.json()
         except Exception as e:
-            logger.error(f"Error in Solr search: {e}")
-            logger.error(traceback.format_exc())
+            log_error(logger, f"Error in Solr search: {e}")
             return {"error": f"Error in search: {str(e)}"}
 
 
 class SearchParams(BaseModel):
-    """Parameters for a search query."""
+    """Parameters for a search query (schema documentation only)."""
     query: str = Field(description="The search query")
 
 
@@ -115,30 +122,30 @@ async def search_solr(query: str):
         results = await solr_client.search(query)
         return json.dumps(results, indent=2)
     except Exception as e:
-        logger.error(f"Error in search_solr resource: {e}")
-        logger.error(traceback.format_exc())
+        log_error(logger, f"Error in search_solr resource: {e}")
         return json.dumps({"error": f"Error processing search: {str(e)}"}, indent=2)
 
 
 @app.tool()
-async def search(params: Dict[str, Any]) -> Dict[str, Any]:
+async def search(query: str) -> Dict[str, Any]:
     """
     Tool for basic document search.
     
+    FastMCP validates the arguments against this signature once at the
+    protocol boundary, so no SearchParams model is built per call.
+    
     Args:
-        params (Dict[str, Any]): Search parameters including query
+        query (str): The search query
         
     Returns:
         Dict[str, Any]: Search results
     """
     try:
-        logger.info(f"Processing search tool request with params: {params}")
-        search_params = SearchParams(**params)
-        results = await solr_client.search(query=search_params.query)
+        logger.info(f"Processing search tool request with query: {query}")
+        results = await solr_client.search(query=query)
         return results
     except Exception as e:
-        logger.error(f"Error in search tool: {e}")
-        logger.error(traceback.format_exc())
+        log_error(logger, f"Error in search tool: {e}")
         return {"error": f"Error processing search: {str(e)}"}
 
 
@@ -164,16 +171,19 @@ if __name__ == "__main__":
     os.environ["HOST"] = MCP_SERVER_HOST
     os.environ["MCP_DEBUG"] = "1"  # Enable debug mode
     
-    # Print diagnostics about the environment and configuration
-    print("=" * 40)
-    print(f"MCP Server Configuration:")
-    print(f"- Host: {MCP_SERVER_HOST}")
-    print(f"- Port: {MCP_SERVER_PORT}")
-    print(f"- Environment variables set:")
-    print(f"  - MCP_PORT={os.environ.get('MCP_PORT')}")
-    print(f"  - HOST={os.environ.get('HOST')}")
-    print(f"  - MCP_DEBUG={os.environ.get('MCP_DEBUG')}")
-    print("=" * 40)
+    # Log diagnostics about the environment and configuration in one call
+    diagnostics = "\n".join([
+        "=" * 40,
+        "MCP Server Configuration:",
+        f"- Host: {MCP_SERVER_HOST}",
+        f"- Port: {MCP_SERVER_PORT}",
+        "- Environment variables set:",
+        f"  - MCP_PORT={MCP_SERVER_PORT}",
+        f"  - HOST={MCP_SERVER_HOST}",
+        "  - MCP_DEBUG=1",
+        "=" * 40,
+    ])
+    logger.info("%s", diagnostics)
     
     # Test Solr connection before starting
     import asyncio
@@ -182,38 +192,34 @@ if __name__ == "__main__":
     # Run the server using uvicorn directly
     # This bypasses the FastMCP.run() method which doesn't support host/port params in MCP 1.6.0
     logger.info(f"Starting Uvicorn MCP server on http://{MCP_SERVER_HOST}:{MCP_SERVER_PORT}...")
-    print(f"Server starting on http://{MCP_SERVER_HOST}:{MCP_SERVER_PORT}")
-    print(f"You can test with: curl -X POST http://localhost:{MCP_SERVER_PORT}/tool/search -H \"Content-Type: application/json\" -d '{{\"query\": \"*:*\", \"rows\": 5}}'")
-    
-    # Access the underlying ASGI app from FastMCP
-    from inspect import getmembers
+    logger.info(f"You can test with: curl -X POST http://localhost:{MCP_SERVER_PORT}/tool/search -H \"Content-Type: application/json\" -d '{{\"query\": \"*:*\", \"rows\": 5}}'")
     
     # Try to find the ASGI app in the FastMCP instance
     try:
-        # FastMCP may store its ASGI app in different attributes based on the version
-        # Common attribute names: app, asgi_app, application, _app
-        asgi_app = None
-        
-        # Check for known attribute names
-        for attr in ['app', 'asgi_app', 'application', '_app']:
-            if hasattr(app, attr):
-                potential_app = getattr(app, attr)
-                print(f"Found potential ASGI app in app.{attr}")
-                asgi_app = potential_app
-                break
+        # FastMCP may store its ASGI app in different attributes based on the version.
+        # Only the known attribute names are looked up; scanning every member would
+        # trigger all descriptors/properties of the FastMCP instance.
+        # Newer FastMCP versions expose factory methods that build the ASGI app
+        factory = next(
+            (
+                getattr(app, attr)
+                for attr in ('streamable_http_app', 'sse_app')
+                if getattr(app, attr, None) is not None
+            ),
+            None,
+        )
+        asgi_app = factory() if factory else next(
+            (
+                getattr(app, attr)
+                for attr in ('app', 'asgi_app', 'application', '_app')
+                if getattr(app, attr, None) is not None
+            ),
+            None,
+        )
         
-        # If not found in known attributes, inspect all attributes
-        if not asgi_app:
-            print("Searching for ASGI app in all attributes...")
-            for name, value in getmembers(app):
-                # Skip private attributes and methods
-                if name.startswith('_') and name != '_app':
-                    continue
-                print(f"Checking attribute: {name}")
-            
-            # Last resort: look at app.__dict__
-            if hasattr(app, '__dict__'):
-                print("App __dict__ keys:", app.__dict__.keys())
+        if not asgi_app and hasattr(app, '__dict__'):
+            # Last resort: show what the instance provides
+            logger.info(f"No known ASGI app attribute found, app __dict__ keys: {list(app.__dict__.keys())}")
         
         # If we found an ASGI app, run it with uvicorn
         if asgi_app:
@@ -226,13 +232,11 @@ if __name__ == "__main__":
             uvicorn.run(app, host=MCP_SERVER_HOST, port=MCP_SERVER_PORT)
     
     except Exception as e:
-        logger.error(f"Error starting server with uvicorn: {e}")
-        logger.error(traceback.format_exc())
+        log_error(logger, f"Error starting server with uvicorn: {e}")
         
         # Last resort: try running with the standard method
         print("\nFalling back to standard app.run() method")
         try:
             app.run()
         except Exception as e2:
-            logger.error(f"Error with fallback method: {e2}")
-            logger.error(traceback.format_exc())
\ No newline at end of file
+            log_error(logger, f"Error with fallback method: {e2}")
\ No newline at end of file
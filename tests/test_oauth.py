@@ -5,22 +5,17 @@ These tests verify the OAuth configuration, token validation, and scope checking
 without requiring a running Keycloak instance.
 """
 import os
+import time
 import pytest
 import json
-from unittest.mock import Mock, AsyncMock, patch, MagicMock
-from datetime import datetime, timedelta
-
-# Add project root to path
-import sys
-from pathlib import Path
-
-project_root = str(Path(__file__).parents[1])
-if project_root not in sys.path:
-    sys.path.insert(0, project_root)
+from dataclasses import FrozenInstanceError, replace
+from unittest.mock import Mock, AsyncMock, patch
+from jose import jwt, JWTError
 
 from src.server.oauth import (
     OAuth2Config,
     TokenValidator,
+    JWKS_CACHE_TTL,
     OAuthError,
     TokenMissingError,
     TokenInvalidError,
@@ -28,16 +23,39 @@ from src.server.oauth import (
 )
 
 
-@pytest.fixture
-def mock_env_oauth_enabled(monkeypatch):
-    """Mock environment variables with OAuth enabled."""
-    monkeypatch.setenv("ENABLE_OAUTH", "true")
-    monkeypatch.setenv("OAUTH_PROVIDER", "keycloak")
-    monkeypatch.setenv("KEYCLOAK_URL", "http://localhost:8080")
-    monkeypatch.setenv("KEYCLOAK_REALM", "solr-mcp")
-    monkeypatch.setenv("KEYCLOAK_CLIENT_ID", "solr-search-server")
-    monkeypatch.setenv("KEYCLOAK_CLIENT_SECRET", "test-secret")
-    monkeypatch.setenv("OAUTH_SCOPES", "solr:search,solr:read")
+# Sample Keycloak payloads, built once at import time; fixtures hand out the
+# shared JWKS read-only and add fresh iat/exp timestamps to copies of the others
+_JWKS = {
+    "keys": [
+        {
+            "kid": "test-key-id",
+            "kty": "RSA",
+            "alg": "RS256",
+            "use": "sig",
+            "n": "0vx7agoebGcQSuuPiLJXZptN9nndrQmbXEps2aiAFbWhM78LhWx4cbbfAAtVT86zwu1RK7aPFFxuhDR1L6tSoc_BJECPebWKRXjBZCiFV4n3oknjhMstn64tZ_2W-5JsGY4Hc5n9yBXArwl93lqt7_RN5w6Cf0h4QyQ5v-65YGjQR0_FDW2QvzqY368QQMicAtaSqzs8KJZgnYb9c7d0zgdAZHzu6qMQvRL5hajrn1n91CbOpbISD08qNLyrdkt-bFTWhAI4vMQFh6WeZu0fM4lFd2NcRwr3XPksINHaQ-G_xBniIqbw0Ls1jF44-csFCur-kEgU8awapJzKnqDKgw",
+            "e": "AQAB",
+        }
+    ]
+}
+
+_BASE_CLAIMS = {
+    "jti": "test-jti",
+    "iss": "http://localhost:8080/realms/solr-mcp",
+    "aud": "account",
+    "sub": "test-user-id",
+    "typ": "Bearer",
+    "azp": "solr-search-server",
+    "scope": "solr:search solr:read",
+    "preferred_username": "testuser",
+    "email": "testuser@example.com",
+}
+
+_BASE_INTROSPECTION = {
+    "active": True,
+    "username": "testuser",
+    "scope": "solr:search solr:read",
+    "client_id": "solr-search-server",
+}
 
 
 @pytest.fixture
@@ -47,81 +65,104 @@ def mock_env_oauth_disabled(monkeypatch):
 
 
 @pytest.fixture
-def oauth_config_enabled(mock_env_oauth_enabled):
-    """Create OAuth config with OAuth enabled."""
-    return OAuth2Config.from_env()
+def oauth_config_enabled(base_oauth_config):
+    """OAuth config with OAuth enabled."""
+    return base_oauth_config
+
+
+@pytest.fixture
+def oauth_config_disabled(base_oauth_config):
+    """OAuth config with OAuth disabled."""
+    return replace(base_oauth_config, enabled=False)
+
+
+@pytest.fixture(scope="class")
+def scope_validator(base_oauth_config):
+    """Token validator with OAuth enabled, built once per test class."""
+    return TokenValidator(base_oauth_config)
 
 
 @pytest.fixture
-def oauth_config_disabled(mock_env_oauth_disabled):
-    """Create OAuth config with OAuth disabled."""
-    return OAuth2Config.from_env()
+def jwks_cached_validator(oauth_config_enabled, mock_jwks):
+    """Token validator with a preloaded JWKS cache, so no JWKS fetch happens."""
+    validator = TokenValidator(oauth_config_enabled)
+    validator._jwks_cache = mock_jwks
+    validator._jwks_cache_expires = time.time() + JWKS_CACHE_TTL
+    return validator
 
 
 @pytest.fixture
 def mock_jwks():
     """Mock JWKS response from Keycloak."""
-    return {
-        "keys": [
-            {
-                "kid": "test-key-id",
-                "kty": "RSA",
-                "use": "sig",
-                "n": "0vx7agoebGcQSuuPiLJXZptN9nndrQmbXEps2aiAFbWhM78LhWx4cbbfAAtVT86zwu1RK7aPFFxuhDR1L6tSoc_BJECPebWKRXjBZCiFV4n3oknjhMstn64tZ_2W-5JsGY4Hc5n9yBXArwl93lqt7_RN5w6Cf0h4QyQ5v-65YGjQR0_FDW2QvzqY368QQMicAtaSqzs8KJZgnYb9c7d0zgdAZHzu6qMQvRL5hajrn1n91CbOpbISD08qNLyrdkt-bFTWhAI4vMQFh6WeZu0fM4lFd2NcRwr3XPksINHaQ-G_xBniIqbw0Ls1jF44-csFCur-kEgU8awapJzKnqDKgw",
-                "e": "AQAB",
-            }
-        ]
-    }
+    return _JWKS
+
+
+@pytest.fixture
+def token_times():
+    """Token timestamps taken when the test runs: issued now, expiring in 5 minutes."""
+    now = int(time.time())
+    return {"iat": now, "exp": now + 300}
 
 
 @pytest.fixture
-def mock_token_claims():
-    """Mock decoded token claims."""
-    return {
-        "exp": int((datetime.utcnow() + timedelta(minutes=5)).timestamp()),
-        "iat": int(datetime.utcnow().timestamp()),
-        "jti": "test-jti",
-        "iss": "http://localhost:8080/realms/solr-mcp",
-        "aud": "account",
-        "sub": "test-user-id",
-        "typ": "Bearer",
-        "azp": "solr-search-server",
-        "scope": "solr:search solr:read",
-        "preferred_username": "testuser",
-        "email": "testuser@example.com",
-    }
+def mock_token_claims(token_times):
+    """Mock decoded token claims (a fresh dict, safe to mutate)."""
+    return {**_BASE_CLAIMS, **token_times}
 
 
 @pytest.fixture
-def mock_introspection_response():
+def mock_introspection_response(token_times):
     """Mock introspection response from Keycloak."""
-    return {
-        "active": True,
-        "exp": int((datetime.utcnow() + timedelta(minutes=5)).timestamp()),
-        "iat": int(datetime.utcnow().timestamp()),
-        "username": "testuser",
-        "scope": "solr:search solr:read",
-        "client_id": "solr-search-server",
-    }
+    return {**_BASE_INTROSPECTION, **token_times}
 
 
 class TestOAuth2Config:
     """Tests for OAuth2Config class."""
 
-    def test_config_from_env_enabled(self, oauth_config_enabled):
+    def test_config_from_env_enabled(self, mock_env_oauth_enabled):
         """Test OAuth config loading when enabled."""
+        oauth_config_enabled = OAuth2Config.from_env()
+
         assert oauth_config_enabled.enabled is True
         assert oauth_config_enabled.provider == "keycloak"
         assert oauth_config_enabled.keycloak_url == "http://localhost:8080"
         assert oauth_config_enabled.realm == "solr-mcp"
         assert oauth_config_enabled.client_id == "solr-search-server"
         assert oauth_config_enabled.client_secret == "test-secret"
-        assert oauth_config_enabled.required_scopes == ["solr:search", "solr:read"]
+        assert oauth_config_enabled.required_scopes == frozenset(
+            {"solr:search", "solr:read"}
+        )
 
-    def test_config_from_env_disabled(self, oauth_config_disabled):
+    def test_config_from_env_disabled(self, mock_env_oauth_disabled):
         """Test OAuth config loading when disabled."""
+        oauth_config_disabled = OAuth2Config.from_env()
+
         assert oauth_config_disabled.enabled is False
 
+    def test_required_scopes_list_normalized(self):
+        """Test that required scopes passed as a list are stored as a frozenset."""
+        config = OAuth2Config(
+            enabled=True,
+            provider="keycloak",
+            keycloak_url="http://localhost:8080",
+            realm="solr-mcp",
+            client_id="solr-search-server",
+            client_secret="",
+            required_scopes=["solr:search", "solr:read", "solr:search"],
+            token_validation_endpoint="",
+            jwks_endpoint="",
+        )
+        assert config.required_scopes == frozenset({"solr:search", "solr:read"})
+
+    def test_config_is_frozen(self, base_oauth_config):
+        """Test that the config is immutable and variants are derived via replace()."""
+        with pytest.raises(FrozenInstanceError):
+            base_oauth_config.enabled = False
+
+        disabled = replace(base_oauth_config, enabled=False)
+        assert disabled.enabled is False
+        assert disabled.required_scopes == base_oauth_config.required_scopes
+
     def test_endpoints_constructed_correctly(self, oauth_config_enabled):
         """Test that OAuth endpoints are constructed correctly."""
         expected_introspect = (
@@ -137,8 +178,9 @@ class TestOAuth2Config:
 class TestTokenValidator:
     """Tests for TokenValidator class."""
 
-    @pytest.mark.asyncio
-    async def test_fetch_jwks_success(self, oauth_config_enabled, mock_jwks):
+    async def test_fetch_jwks_success(
+        self, oauth_config_enabled, mock_jwks, make_fake_client
+    ):
         """Test successful JWKS fetching."""
         validator = TokenValidator(oauth_config_enabled)
 
@@ -147,18 +189,17 @@ class TestTokenValidator:
         mock_response.json = Mock(return_value=mock_jwks)
         mock_response.raise_for_status = Mock()
 
-        mock_client = AsyncMock()
-        mock_client.get = AsyncMock(return_value=mock_response)
-
-        validator._http_client = mock_client
+        fake_client = make_fake_client(mock_response)
+        validator._http_client = fake_client
 
         jwks = await validator._fetch_jwks()
 
         assert jwks == mock_jwks
-        mock_client.get.assert_called_once_with(oauth_config_enabled.jwks_endpoint)
+        assert fake_client.calls == [("get", oauth_config_enabled.jwks_endpoint)]
 
-    @pytest.mark.asyncio
-    async def test_fetch_jwks_caching(self, oauth_config_enabled, mock_jwks):
+    async def test_fetch_jwks_caching(
+        self, oauth_config_enabled, mock_jwks, make_fake_client
+    ):
         """Test that JWKS is cached and not fetched multiple times."""
         validator = TokenValidator(oauth_config_enabled)
 
@@ -167,10 +208,8 @@ class TestTokenValidator:
         mock_response.json = Mock(return_value=mock_jwks)
         mock_response.raise_for_status = Mock()
 
-        mock_client = AsyncMock()
-        mock_client.get = AsyncMock(return_value=mock_response)
-
-        validator._http_client = mock_client
+        fake_client = make_fake_client(mock_response)
+        validator._http_client = fake_client
 
         # First fetch
         jwks1 = await validator._fetch_jwks()
@@ -179,11 +218,10 @@ class TestTokenValidator:
 
         assert jwks1 == jwks2
         # Should only call get() once due to caching
-        assert mock_client.get.call_count == 1
+        assert len(fake_client.calls) == 1
 
-    @pytest.mark.asyncio
     async def test_validate_token_introspection_success(
-        self, oauth_config_enabled, mock_introspection_response
+        self, oauth_config_enabled, mock_introspection_response, make_fake_client
     ):
         """Test successful token validation via introspection."""
         validator = TokenValidator(oauth_config_enabled)
@@ -193,20 +231,19 @@ class TestTokenValidator:
         mock_response.json = Mock(return_value=mock_introspection_response)
         mock_response.raise_for_status = Mock()
 
-        mock_client = AsyncMock()
-        mock_client.post = AsyncMock(return_value=mock_response)
-
-        validator._http_client = mock_client
+        fake_client = make_fake_client(mock_response)
+        validator._http_client = fake_client
 
         result = await validator.validate_token_introspection("fake-token")
 
         assert result["active"] is True
         assert result["username"] == "testuser"
-        mock_client.post.assert_called_once()
+        assert fake_client.calls == [
+            ("post", oauth_config_enabled.token_validation_endpoint)
+        ]
 
-    @pytest.mark.asyncio
     async def test_validate_token_introspection_inactive(
-        self, oauth_config_enabled
+        self, oauth_config_enabled, make_fake_client
     ):
         """Test token validation with inactive token."""
         validator = TokenValidator(oauth_config_enabled)
@@ -216,15 +253,26 @@ class TestTokenValidator:
         mock_response.json = Mock(return_value={"active": False})
         mock_response.raise_for_status = Mock()
 
-        mock_client = AsyncMock()
-        mock_client.post = AsyncMock(return_value=mock_response)
-
-        validator._http_client = mock_client
+        validator._http_client = make_fake_client(mock_response)
 
         with pytest.raises(Exception, match="not active"):
             await validator.validate_token_introspection("fake-token")
 
-    @pytest.mark.asyncio
+    async def test_validate_token_local_unknown_kid(
+        self, jwks_cached_validator, make_fake_client
+    ):
+        """Test that local validation uses the cached JWKS without HTTP calls."""
+        fake_client = make_fake_client(None)
+        jwks_cached_validator._http_client = fake_client
+        token = jwt.encode(
+            {"sub": "test-user-id"}, "secret", headers={"kid": "unknown-key-id"}
+        )
+
+        with pytest.raises(JWTError, match="No matching key"):
+            await jwks_cached_validator.validate_token_local(token)
+
+        assert fake_client.calls == []
+
     async def test_validate_token_oauth_disabled(self, oauth_config_disabled):
         """Test that validation is skipped when OAuth is disabled."""
         validator = TokenValidator(oauth_config_disabled)
@@ -234,37 +282,94 @@ class TestTokenValidator:
         assert result["sub"] == "anonymous"
         assert result["scope"] == "all"
 
-    def test_check_scopes_success(self, oauth_config_enabled, mock_token_claims):
-        """Test successful scope checking."""
-        validator = TokenValidator(oauth_config_enabled)
-
-        # Token has all required scopes
-        assert validator.check_scopes(mock_token_claims) is True
+    async def test_shared_http_client_not_closed(self, oauth_config_enabled):
+        """Test that an injected HTTP client is used but not closed by the validator."""
+        shared_client = AsyncMock()
+        validator = TokenValidator(oauth_config_enabled, http_client=shared_client)
 
-    def test_check_scopes_missing(self, oauth_config_enabled, mock_token_claims):
-        """Test scope checking with missing scopes."""
-        validator = TokenValidator(oauth_config_enabled)
-
-        # Token is missing required scopes
-        mock_token_claims["scope"] = "solr:search"  # Missing solr:read
+        async with validator:
+            assert validator._http_client is shared_client
 
-        assert validator.check_scopes(mock_token_claims) is False
+        shared_client.aclose.assert_not_called()
 
-    def test_check_scopes_list_format(self, oauth_config_enabled):
-        """Test scope checking with scopes as list."""
-        validator = TokenValidator(oauth_config_enabled)
+    async def test_validate_token_cached(
+        self, jwks_cached_validator, mock_token_claims
+    ):
+        """Test that a locally validated token is served from the cache on reuse."""
+        token = jwt.encode(
+            {"sub": "test-user-id"}, "secret", headers={"kid": "test-key-id"}
+        )
+        expected_claims = dict(mock_token_claims)
+
+        with patch(
+            "src.server.oauth.jwt.decode", return_value=mock_token_claims
+        ) as mock_decode:
+            claims1 = await jwks_cached_validator.validate_token(token)
+            claims1["scope"] = "tampered"
+            claims2 = await jwks_cached_validator.validate_token(token)
+
+        # Signature verification should only run for the first call
+        assert mock_decode.call_count == 1
+        # Changing returned claims must not affect the cached claims
+        assert claims2 == expected_claims
+
+    async def test_validate_token_cached_nested_claims(
+        self, jwks_cached_validator, mock_token_claims
+    ):
+        """Test that changing nested claims of a cached token keeps the cache intact."""
+        token = jwt.encode(
+            {"sub": "test-user-id"}, "secret", headers={"kid": "test-key-id"}
+        )
+        mock_token_claims["realm_access"] = {"roles": ["user"]}
 
-        token_data = {"scope": ["solr:search", "solr:read", "extra:scope"]}
+        with patch("src.server.oauth.jwt.decode", return_value=mock_token_claims):
+            claims1 = await jwks_cached_validator.validate_token(token)
+            claims1["realm_access"]["roles"].append("admin")
+            claims2 = await jwks_cached_validator.validate_token(token)
+            claims2["realm_access"]["roles"].append("admin")
+            claims3 = await jwks_cached_validator.validate_token(token)
 
-        assert validator.check_scopes(token_data) is True
+        assert claims3["realm_access"] == {"roles": ["user"]}
 
-    def test_check_scopes_empty(self, oauth_config_enabled):
-        """Test scope checking with no scopes in token."""
+    async def test_validate_token_introspection_not_cached(
+        self, oauth_config_enabled, mock_introspection_response, make_fake_client
+    ):
+        """Test that introspection is repeated for every call to catch revocation."""
         validator = TokenValidator(oauth_config_enabled)
-
-        token_data = {"scope": ""}
-
-        assert validator.check_scopes(token_data) is False
+        mock_response = Mock()
+        mock_response.json = Mock(return_value=mock_introspection_response)
+        mock_response.raise_for_status = Mock()
+        fake_client = make_fake_client(mock_response)
+        validator._http_client = fake_client
+
+        await validator.validate_token("fake-token", use_introspection=True)
+        await validator.validate_token("fake-token", use_introspection=True)
+
+        assert len(fake_client.calls) == 2
+
+    @pytest.mark.parametrize(
+        "token_scope,expected",
+        [
+            ("solr:search solr:read", True),
+            ("solr:search", False),  # Missing solr:read
+            (["solr:search", "solr:read", "extra:scope"], True),  # List format
+            ("", False),  # No scopes
+        ],
+        ids=["success", "missing", "list_format", "empty"],
+    )
+    def test_check_scopes(self, scope_validator, token_scope, expected):
+        """Test scope checking against the required scopes."""
+        assert scope_validator.check_scopes({"scope": token_scope}) is expected
+
+    def test_check_scopes_logs_sorted_scopes(self, scope_validator, caplog):
+        """Test that missing scopes are logged as a sorted, readable list."""
+        with caplog.at_level("WARNING", logger="src.server.oauth"):
+            scope_validator.check_scopes({"scope": "solr:search"})
+
+        assert (
+            "Token missing required scopes: solr:read. "
+            "Has: solr:search, Requires: solr:read, solr:search"
+        ) in caplog.text
 
 
 class TestOAuthExceptions:
@@ -276,19 +381,18 @@ class TestOAuthExceptions:
         assert issubclass(TokenInvalidError, OAuthError)
         assert issubclass(InsufficientScopesError, OAuthError)
 
-    def test_exception_messages(self):
+    @pytest.mark.parametrize(
+        "exc_cls,message",
+        [
+            (TokenMissingError, "Test message"),
+            (TokenInvalidError, "Invalid token"),
+            (InsufficientScopesError, "Missing scopes"),
+        ],
+        ids=["missing", "invalid", "scopes"],
+    )
+    def test_exception_messages(self, exc_cls, message):
         """Test exception messages."""
-        try:
-            raise TokenMissingError("Test message")
-        except TokenMissingError as e:
-            assert str(e) == "Test message"
-
-        try:
-            raise TokenInvalidError("Invalid token")
-        except TokenInvalidError as e:
-            assert str(e) == "Invalid token"
-
-        try:
-            raise InsufficientScopesError("Missing scopes")
-        except InsufficientScopesError as e:
-            assert str(e) == "Missing scopes"
+        with pytest.raises(exc_cls) as exc_info:
+            raise exc_cls(message)
+
+        assert str(exc_info.value) == message
@@ -7,22 +7,16 @@ These tests require:
 - Client 'solr-search-server' configured
 - Test user 'testuser' with password 'testpassword'
 
-Run setup-keycloak.sh first to configure Keycloak automatically.
+Run setup-keycloak.sh first to configure Keycloak automatically, then run
+the tests with RUN_KEYCLOAK_TESTS=1 (they are skipped otherwise).
 """
 import os
+import functools
+from dataclasses import replace
 import pytest
 import pytest_asyncio
 import httpx
 from unittest.mock import AsyncMock
-from datetime import datetime, timedelta
-
-# Add project root to path
-import sys
-from pathlib import Path
-
-project_root = str(Path(__file__).parents[1])
-if project_root not in sys.path:
-    sys.path.insert(0, project_root)
 
 from src.server.oauth import (
     OAuth2Config,
@@ -33,24 +27,44 @@ from src.server.oauth import (
 )
 
 
-# Check if Keycloak is available
+@functools.lru_cache(maxsize=1)
 def is_keycloak_available():
     """Check if Keycloak is running and accessible."""
     try:
-        response = httpx.get("http://localhost:8080", timeout=2)
+        response = httpx.get(
+            "http://localhost:8080", timeout=httpx.Timeout(0.25, connect=0.25)
+        )
         return response.status_code == 200
-    except:
+    except httpx.HTTPError:
         return False
 
 
-# Skip all tests if Keycloak is not available
-pytestmark = pytest.mark.skipif(
-    not is_keycloak_available(),
-    reason="Keycloak not available at localhost:8080. Run: docker-compose up -d keycloak",
+# Keycloak tests are opt-in; without RUN_KEYCLOAK_TESTS=1 Keycloak is not probed
+RUN_KEYCLOAK_TESTS = os.getenv("RUN_KEYCLOAK_TESTS") == "1"
+KEYCLOAK_READY = RUN_KEYCLOAK_TESTS and is_keycloak_available()
+
+if RUN_KEYCLOAK_TESTS:
+    _SKIP_REASON = (
+        "Keycloak not available at localhost:8080. "
+        "Run: docker-compose up -d keycloak"
+    )
+else:
+    _SKIP_REASON = "Set RUN_KEYCLOAK_TESTS=1 to run Keycloak tests"
+
+pytestmark = pytest.mark.skipif(not KEYCLOAK_READY, reason=_SKIP_REASON)
+
+
+# A token that is structurally valid but expired (exp 2020-09-13)
+_EXPIRED_TOKEN = (
+    "eyJhbGciOiJSUzI1NiIsInR5cCIgOiAiSldUIiwia2lkIiA6ICJSdk9FcFUyazRIUGx3V29"
+    "Ybl91dWtMU0o4YlJIbFNkNWwtMXRWR2cxaWZVIn0.eyJleHAiOjE2MDAwMDAwMDAsImlhdC"
+    "I6MTYwMDAwMDAwMCwianRpIjoiZXhwaXJlZC10b2tlbiIsImlzcyI6Imh0dHA6Ly9sb2Nh"
+    "bGhvc3Q6ODA4MC9yZWFsbXMvc29sci1tY3AiLCJhdWQiOiJhY2NvdW50Iiwic3ViIjoidG"
+    "VzdC11c2VyIiwidHlwIjoiQmVhcmVyIn0.invalid-signature"
 )
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def oauth_config():
     """OAuth configuration for integration tests."""
     # Read client secret from environment or use default from setup-keycloak.sh
@@ -69,175 +83,145 @@ def oauth_config():
     )
 
 
-@pytest_asyncio.fixture
-async def valid_access_token(oauth_config):
-    """Get a valid access token from Keycloak."""
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"{oauth_config.keycloak_url}/realms/{oauth_config.realm}/protocol/openid-connect/token",
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
-            data={
-                "client_id": oauth_config.client_id,
-                "client_secret": oauth_config.client_secret,
-                "username": "testuser",
-                "password": "testpassword",
-                "grant_type": "password",
-                "scope": "solr:search solr:read",
-            },
-        )
+@pytest_asyncio.fixture(scope="session")
+async def shared_http_client():
+    """Pooled HTTP client shared by all Keycloak requests in the test session."""
+    async with httpx.AsyncClient(
+        limits=httpx.Limits(max_keepalive_connections=10, max_connections=20)
+    ) as client:
+        yield client
+
+
+@pytest_asyncio.fixture(scope="module")
+async def warm_validator(oauth_config, shared_http_client):
+    """Token validator with the JWKS fetched once and shared by the module's tests."""
+    validator = TokenValidator(oauth_config, http_client=shared_http_client)
+    async with validator:
+        await validator._fetch_jwks()
+        yield validator
+
+
+@pytest_asyncio.fixture(scope="module")
+async def valid_access_token(oauth_config, shared_http_client):
+    """Get a valid access token from Keycloak, shared by all tests in the module."""
+    # Token with only solr:search and solr:read scopes
+    response = await shared_http_client.post(
+        f"{oauth_config.keycloak_url}/realms/{oauth_config.realm}/protocol/openid-connect/token",
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+        data={
+            "client_id": oauth_config.client_id,
+            "client_secret": oauth_config.client_secret,
+            "username": "testuser",
+            "password": "testpassword",
+            "grant_type": "password",
+            "scope": "solr:search solr:read",
+        },
+    )
 
-        if response.status_code != 200:
-            pytest.skip(
-                f"Failed to get access token from Keycloak. "
-                f"Status: {response.status_code}, Response: {response.text}"
-            )
+    if response.status_code != 200:
+        pytest.skip(
+            f"Failed to get access token from Keycloak. "
+            f"Status: {response.status_code}, Response: {response.text}"
+        )
 
-        token_data = response.json()
-        return token_data["access_token"]
+    token_data = response.json()
+    return token_data["access_token"]
 
 
 @pytest.mark.integration
-@pytest.mark.asyncio
 class TestKeycloakIntegration:
     """Integration tests with real Keycloak instance."""
 
-    async def test_fetch_jwks_from_keycloak(self, oauth_config):
-        """Test fetching JWKS from real Keycloak."""
-        validator = TokenValidator(oauth_config)
-
-        async with validator:
-            jwks = await validator._fetch_jwks()
+    async def test_fetch_jwks_from_keycloak(self, warm_validator):
+        """Test that the JWKS was fetched from real Keycloak and cached."""
+        assert warm_validator._jwks_cache is not None
+        jwks = warm_validator._jwks_cache
 
-            assert "keys" in jwks
-            assert len(jwks["keys"]) > 0
-            assert "kid" in jwks["keys"][0]
-            assert "kty" in jwks["keys"][0]
+        assert "keys" in jwks
+        assert len(jwks["keys"]) > 0
+        assert "kid" in jwks["keys"][0]
+        assert "kty" in jwks["keys"][0]
 
-    async def test_validate_token_with_jwks(self, oauth_config, valid_access_token):
+    async def test_validate_token_with_jwks(self, valid_access_token, warm_validator):
         """Test token validation using JWKS with real Keycloak token."""
-        validator = TokenValidator(oauth_config)
-
-        async with validator:
-            # Validate using local JWKS
-            token_data = await validator.validate_token(
-                valid_access_token, use_introspection=False
-            )
+        # Validate using local JWKS
+        token_data = await warm_validator.validate_token(
+            valid_access_token, use_introspection=False
+        )
 
-            assert "sub" in token_data
-            assert "preferred_username" in token_data
-            assert token_data["preferred_username"] == "testuser"
-            assert "scope" in token_data
+        assert "sub" in token_data
+        assert "preferred_username" in token_data
+        assert token_data["preferred_username"] == "testuser"
+        assert "scope" in token_data
 
     async def test_validate_token_with_introspection(
-        self, oauth_config, valid_access_token
+        self, valid_access_token, warm_validator
     ):
         """Test token validation using introspection with real Keycloak."""
-        validator = TokenValidator(oauth_config)
-
-        async with validator:
-            # Validate using introspection endpoint
-            introspection = await validator.validate_token(
-                valid_access_token, use_introspection=True
-            )
+        # Validate using introspection endpoint
+        introspection = await warm_validator.validate_token(
+            valid_access_token, use_introspection=True
+        )
 
-            assert introspection["active"] is True
-            assert introspection["username"] == "testuser"
-            assert "scope" in introspection
+        assert introspection["active"] is True
+        assert introspection["username"] == "testuser"
+        assert "scope" in introspection
 
-    async def test_validate_invalid_token(self, oauth_config):
+    async def test_validate_invalid_token(self, warm_validator):
         """Test that invalid tokens are rejected."""
-        validator = TokenValidator(oauth_config)
-
-        async with validator:
-            with pytest.raises(Exception):
-                await validator.validate_token("invalid-token-xyz")
+        with pytest.raises(Exception):
+            await warm_validator.validate_token("invalid-token-xyz")
 
-    async def test_validate_expired_token(self, oauth_config):
+    async def test_validate_expired_token(self, warm_validator):
         """Test that expired tokens are rejected."""
-        # This is a token that is structurally valid but expired
-        expired_token = (
-            "eyJhbGciOiJSUzI1NiIsInR5cCIgOiAiSldUIiwia2lkIiA6ICJSdk9FcFUyazRIUGx3V29"
-            "Ybl91dWtMU0o4YlJIbFNkNWwtMXRWR2cxaWZVIn0.eyJleHAiOjE2MDAwMDAwMDAsImlhdC"
-            "I6MTYwMDAwMDAwMCwianRpIjoiZXhwaXJlZC10b2tlbiIsImlzcyI6Imh0dHA6Ly9sb2Nh"
-            "bGhvc3Q6ODA4MC9yZWFsbXMvc29sci1tY3AiLCJhdWQiOiJhY2NvdW50Iiwic3ViIjoidG"
-            "VzdC11c2VyIiwidHlwIjoiQmVhcmVyIn0.invalid-signature"
-        )
-
-        validator = TokenValidator(oauth_config)
-
-        async with validator:
-            with pytest.raises(Exception):
-                await validator.validate_token(expired_token)
+        with pytest.raises(Exception):
+            await warm_validator.validate_token(_EXPIRED_TOKEN)
 
-    async def test_scope_validation(self, oauth_config, valid_access_token):
+    async def test_scope_validation(self, valid_access_token, warm_validator):
         """Test that tokens are checked for required scopes."""
-        validator = TokenValidator(oauth_config)
-
-        async with validator:
-            # Get token data
-            token_data = await validator.validate_token(
-                valid_access_token, use_introspection=True
-            )
+        # Get token data
+        token_data = await warm_validator.validate_token(
+            valid_access_token, use_introspection=True
+        )
 
-            # Check scopes
-            has_scopes = validator.check_scopes(token_data)
-            assert has_scopes is True
+        # Check scopes
+        has_scopes = warm_validator.check_scopes(token_data)
+        assert has_scopes is True
 
-    async def test_missing_scopes_detection(self, oauth_config):
+    async def test_missing_scopes_detection(
+        self, oauth_config, valid_access_token, shared_http_client
+    ):
         """Test detection of missing required scopes."""
         # Create config that requires a scope the token doesn't have
-        strict_config = OAuth2Config(
-            enabled=True,
-            provider="keycloak",
-            keycloak_url=oauth_config.keycloak_url,
-            realm=oauth_config.realm,
-            client_id=oauth_config.client_id,
-            client_secret=oauth_config.client_secret,
+        strict_config = replace(
+            oauth_config,
             required_scopes=["solr:search", "solr:read", "solr:admin"],  # admin scope not granted
-            token_validation_endpoint=oauth_config.token_validation_endpoint,
-            jwks_endpoint=oauth_config.jwks_endpoint,
         )
 
-        validator = TokenValidator(strict_config)
-
-        async with httpx.AsyncClient() as client:
-            # Get token with only solr:search and solr:read scopes
-            response = await client.post(
-                f"{oauth_config.keycloak_url}/realms/{oauth_config.realm}/protocol/openid-connect/token",
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-                data={
-                    "client_id": oauth_config.client_id,
-                    "client_secret": oauth_config.client_secret,
-                    "username": "testuser",
-                    "password": "testpassword",
-                    "grant_type": "password",
-                    "scope": "solr:search solr:read",  # Not requesting solr:admin
-                },
-            )
+        validator = TokenValidator(strict_config, http_client=shared_http_client)
 
-            token = response.json()["access_token"]
-
-            async with validator:
-                token_data = await validator.validate_token(token, use_introspection=True)
+        # The shared token only has solr:search and solr:read (no solr:admin)
+        async with validator:
+            token_data = await validator.validate_token(
+                valid_access_token, use_introspection=True
+            )
 
-                # Should fail scope check
-                has_scopes = validator.check_scopes(token_data)
-                assert has_scopes is False
+            # Should fail scope check
+            has_scopes = validator.check_scopes(token_data)
+            assert has_scopes is False
 
 
 @pytest.mark.integration
-@pytest.mark.asyncio
 class TestMCPServerOAuthIntegration:
     """Integration tests for MCP server with OAuth enabled."""
 
-    async def test_search_tool_with_valid_token(self, oauth_config, valid_access_token):
+    async def test_search_tool_with_valid_token(
+        self, oauth_config, valid_access_token, warm_validator, make_mcp_context
+    ):
         """Test search tool with valid OAuth token."""
         from src.server.mcp_server import search
         from src.server.solr_client import SolrClient
 
-        # Mock context with OAuth enabled
-        context = AsyncMock()
-
         # Create mock Solr client
         mock_solr_client = AsyncMock()
         mock_solr_client.search.return_value = {
@@ -245,83 +229,56 @@ class TestMCPServerOAuthIntegration:
             "response": {"numFound": 0, "start": 0, "docs": []},
         }
 
-        # Setup context
-        context.request_context.lifespan_context.solr_client = mock_solr_client
-        context.request_context.lifespan_context.oauth_config = oauth_config
+        # Mock context with OAuth enabled
+        context = make_mcp_context(mock_solr_client, oauth_config, warm_validator)
 
-        # Create validator
-        validator = TokenValidator(oauth_config)
-        async with validator:
-            context.request_context.lifespan_context.token_validator = validator
-
-            context.info = AsyncMock()
-            context.debug = AsyncMock()
-            context.warning = AsyncMock()
-            context.error = AsyncMock()
-
-            # Call search tool with valid token
-            result = await search(
-                query="*:*",
-                access_token=valid_access_token,
-                ctx=context,
-            )
+        # Call search tool with valid token
+        result = await search(
+            query="*:*",
+            access_token=valid_access_token,
+            ctx=context,
+        )
 
-            # Should succeed
-            assert "error" not in result
-            assert "response" in result
+        # Should succeed
+        assert "error" not in result
+        assert "response" in result
 
-    async def test_search_tool_without_token(self, oauth_config):
+    async def test_search_tool_without_token(
+        self, oauth_config, warm_validator, make_mcp_context
+    ):
         """Test search tool without token when OAuth is enabled."""
         from src.server.mcp_server import search
 
         # Mock context with OAuth enabled
-        context = AsyncMock()
+        context = make_mcp_context(AsyncMock(), oauth_config, warm_validator)
 
-        mock_solr_client = AsyncMock()
-        context.request_context.lifespan_context.solr_client = mock_solr_client
-        context.request_context.lifespan_context.oauth_config = oauth_config
-
-        validator = TokenValidator(oauth_config)
-        async with validator:
-            context.request_context.lifespan_context.token_validator = validator
-
-            context.info = AsyncMock()
-
-            # Call search tool without token
-            result = await search(
-                query="*:*",
-                access_token=None,  # No token provided
-                ctx=context,
-            )
+        # Call search tool without token
+        result = await search(
+            query="*:*",
+            access_token=None,  # No token provided
+            ctx=context,
+        )
 
-            # Should fail with authentication error
-            assert "error" in result
-            assert "Authentication failed" in result["error"]
+        # Should fail with authentication error
+        assert "error" in result
+        assert "Authentication failed" in result["error"]
 
-    async def test_search_tool_with_invalid_token(self, oauth_config):
+    async def test_search_tool_with_invalid_token(
+        self, oauth_config, warm_validator, make_mcp_context
+    ):
         """Test search tool with invalid token."""
         from src.server.mcp_server import search
 
         # Mock context with OAuth enabled
-        context = AsyncMock()
-
-        mock_solr_client = AsyncMock()
-        context.request_context.lifespan_context.solr_client = mock_solr_client
-        context.request_context.lifespan_context.oauth_config = oauth_config
-
-        validator = TokenValidator(oauth_config)
-        async with validator:
-            context.request_context.lifespan_context.token_validator = validator
-
-            context.info = AsyncMock()
+        context = make_mcp_context(AsyncMock(), oauth_config, warm_validator)
 
-            # Call search tool with invalid token
-            result = await search(
-                query="*:*",
-                access_token="invalid-token-12345",
-                ctx=context,
-            )
+        # Call search tool with invalid token
+        result = await search(
+            query="*:*",
+            access_token="invalid-token-12345",
+            ctx=context,
+        )
 
-            # Should fail with authentication error
-            assert "error" in result
-            assert "Authentication failed" in result["error"]
+        # Should fail with authentication error
+        assert "error" in result
+        assert "Authentication failed" in result["error"]
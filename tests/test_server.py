@@ -2,55 +2,75 @@
 Tests for the Solr MCP Server functionality.
 """
 
-import json
-import os
 import pytest
 import asyncio
-from unittest.mock import AsyncMock, patch, MagicMock
-
-# Add the src directory to the path so we can import from it
-import sys
-
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+import copy
+from unittest.mock import patch
 
 import httpx
-from mcp.server.fastmcp import FastMCP
+import orjson
+import respx
+from src.server import mcp_server
 from src.server.mcp_server import search_solr, search, get_document
+from src.server.oauth import OAuth2Config
 from src.server.solr_client import SolrClient
 
+SELECT_URL = "http://example.com/solr/test_collection/select"
 
-@pytest.fixture
-def mock_solr_client():
-    """Create a mock Solr client for testing"""
-    client = AsyncMock()
-    # Mock search method
-    search_result = {
-        "responseHeader": {"status": 0},
-        "response": {
-            "numFound": 1,
-            "start": 0,
-            "docs": [{"id": "doc1", "title": ["Introduction to Apache Solr"]}],
-        },
-    }
-    client.search.return_value = search_result
-    # Mock get_document method
-    doc_result = {
-        "id": "doc1",
-        "title": ["Introduction to Apache Solr"],
-        "author": ["John Smith"],
-    }
-    client.get_document.return_value = doc_result
-    return client
 
+# Default results of the mocked Solr client
+SEARCH_RESULT = {
+    "responseHeader": {"status": 0},
+    "response": {
+        "numFound": 1,
+        "start": 0,
+        "docs": [{"id": "doc1", "title": ["Introduction to Apache Solr"]}],
+    },
+}
+DOC_RESULT = {
+    "id": "doc1",
+    "title": ["Introduction to Apache Solr"],
+    "author": ["John Smith"],
+}
+# Raw Solr response body for respx routes, encoded once
+SEARCH_RESULT_BYTES = orjson.dumps(SEARCH_RESULT)
 
-@pytest.fixture
-def mock_context(mock_solr_client):
-    """Create a mock context with the solr client"""
-    from src.server.oauth import OAuth2Config
 
-    context = AsyncMock()
-    context.request_context.lifespan_context.solr_client = mock_solr_client
+class FakeSolr:
+    """Stand-in for SolrClient that records its calls and returns fixed results
 
+    Every call returns a deep copy, so changes made by the tools or a test never
+    leak into the shared results of later tests.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.reset()
+
+    def reset(self):
+        """Forget recorded calls and restore the default results"""
+        self.calls.clear()
+        self.search_result = SEARCH_RESULT
+        self.document_result = DOC_RESULT
+
+    async def search(self, *args, **kwargs):
+        self.calls.append(("search", args, kwargs))
+        return copy.deepcopy(self.search_result)
+
+    async def get_document(self, *args, **kwargs):
+        self.calls.append(("get_document", args, kwargs))
+        return copy.deepcopy(self.document_result)
+
+
+@pytest.fixture(scope="module")
+def mock_solr_client():
+    """Create a fake Solr client, shared by all tests of this module"""
+    return FakeSolr()
+
+
+@pytest.fixture(scope="module")
+def mock_context(mock_solr_client, make_mcp_context):
+    """Create a mock context with the solr client, shared by all tests of this module"""
     # Create OAuth config with OAuth disabled for tests
     oauth_config = OAuth2Config(
         enabled=False,
@@ -63,25 +83,29 @@ def mock_context(mock_solr_client):
         token_validation_endpoint="http://localhost:8080/realms/solr-mcp/protocol/openid-connect/token/introspect",
         jwks_endpoint="http://localhost:8080/realms/solr-mcp/protocol/openid-connect/certs",
     )
-    context.request_context.lifespan_context.oauth_config = oauth_config
-    context.request_context.lifespan_context.token_validator = None
+    return make_mcp_context(mock_solr_client, oauth_config, mock_logging=True)
+
 
-    # Mock async context methods
-    context.info = AsyncMock()
-    context.debug = AsyncMock()
-    context.warning = AsyncMock()
-    context.error = AsyncMock()
-    return context
+@pytest.fixture(autouse=True)
+def reset_mocks(mock_solr_client, mock_context):
+    """Reset the shared fakes and restore the default Solr results for each test"""
+    mock_solr_client.reset()
+    for method in (
+        mock_context.info,
+        mock_context.debug,
+        mock_context.warning,
+        mock_context.error,
+    ):
+        method.reset_mock()
 
 
-@pytest.mark.asyncio
 async def test_search_solr_resource(mock_context):
     """Test the solr://search/{query} resource"""
     # Call the resource function with new signature: ctx, query
     result = await search_solr(mock_context, "*:*")
 
     # Verify the result is properly formatted
-    parsed_result = json.loads(result)
+    parsed_result = orjson.loads(result)
     assert "response" in parsed_result
     assert parsed_result["response"]["numFound"] >= 1
 
@@ -89,7 +113,6 @@ async def test_search_solr_resource(mock_context):
     assert mock_context.info.called
 
 
-@pytest.mark.asyncio
 async def test_search_tool(mock_context):
     """Test the search tool with parameters"""
     # Call the tool function with new signature: query, filter_query, sort, rows, start, ctx
@@ -107,7 +130,6 @@ async def test_search_tool(mock_context):
     assert mock_context.info.called
 
 
-@pytest.mark.asyncio
 async def test_get_document_tool(mock_context):
     """Test the get_document tool"""
     # Call the tool function with new signature: id, fields, ctx
@@ -126,33 +148,28 @@ async def test_get_document_tool(mock_context):
     assert mock_context.info.called
 
 
-@pytest.mark.asyncio
+@respx.mock
 async def test_solr_client_search():
-    mock_response = AsyncMock()
-    mock_response.raise_for_status = AsyncMock()
-    mock_response.json = AsyncMock(
-        return_value={
-            "responseHeader": {"status": 0},
-            "response": {
-                "numFound": 2,
-                "start": 0,
-                "docs": [
-                    {"id": "doc1", "title": "First Document"},
-                    {"id": "doc2", "title": "Second Document"},
-                ],
+    route = respx.get(SELECT_URL).mock(
+        return_value=httpx.Response(
+            200,
+            json={
+                "responseHeader": {"status": 0},
+                "response": {
+                    "numFound": 2,
+                    "start": 0,
+                    "docs": [
+                        {"id": "doc1", "title": "First Document"},
+                        {"id": "doc2", "title": "Second Document"},
+                    ],
+                },
             },
-        }
+        )
     )
 
-    async def get(*args, **kwargs):
-        return mock_response
-
-    mock_client = AsyncMock()
-    mock_client.__aenter__.return_value.get = get
-    with patch("httpx.AsyncClient", return_value=mock_client):
-        client = SolrClient(
-            base_url="http://example.com/solr", collection="test_collection"
-        )
+    async with SolrClient(
+        base_url="http://example.com/solr", collection="test_collection"
+    ) as client:
         result = await client.search(
             query="test",
             filter_query="field:value",
@@ -165,45 +182,125 @@ async def test_solr_client_search():
         assert result["response"]["docs"][0]["id"] == "doc1"
         assert result["response"]["docs"][1]["id"] == "doc2"
 
+    # The query parameters are built by the real SolrClient
+    params = route.calls.last.request.url.params
+    assert params["q"] == "test"
+    assert params["fq"] == "field:value"
+    assert params["sort"] == "score desc"
+    assert params["rows"] == "10"
+    assert params["wt"] == "json"
+    assert params["defType"] == "edismax"
 
-@pytest.mark.asyncio
+
+@respx.mock
 async def test_solr_client_get_document():
-    mock_response = AsyncMock()
-    mock_response.raise_for_status = AsyncMock()
-    mock_response.json = AsyncMock(
-        return_value={
-            "responseHeader": {"status": 0},
-            "response": {
-                "numFound": 1,
-                "start": 0,
-                "docs": [
-                    {
-                        "id": "doc1",
-                        "title": "Test Document",
-                        "content": "This is a test",
-                    }
-                ],
+    route = respx.get(SELECT_URL).mock(
+        return_value=httpx.Response(
+            200,
+            json={
+                "responseHeader": {"status": 0},
+                "response": {
+                    "numFound": 1,
+                    "start": 0,
+                    "docs": [
+                        {
+                            "id": "doc1",
+                            "title": "Test Document",
+                            "content": "This is a test",
+                        }
+                    ],
+                },
             },
-        }
+        )
     )
 
-    async def get(*args, **kwargs):
-        return mock_response
-
-    mock_client = AsyncMock()
-    mock_client.__aenter__.return_value.get = get
-    with patch("httpx.AsyncClient", return_value=mock_client):
-        client = SolrClient(
-            base_url="http://example.com/solr", collection="test_collection"
-        )
+    async with SolrClient(
+        base_url="http://example.com/solr", collection="test_collection"
+    ) as client:
         result = await client.get_document(doc_id="doc1", fields=["id", "title"])
         assert result["id"] == "doc1"
         assert result["title"] == "Test Document"
         assert "content" in result
 
+    params = route.calls.last.request.url.params
+    assert params["q"] == "id:doc1"
+    assert params["fl"] == "id,title"
+
+
+@respx.mock
+async def test_solr_client_reuses_http_client():
+    """Test that SolrClient keeps one pooled HTTP client until it is closed"""
+    route = respx.get(SELECT_URL).mock(
+        return_value=httpx.Response(
+            200,
+            content=SEARCH_RESULT_BYTES,
+            headers={"Content-Type": "application/json"},
+        )
+    )
+
+    async with SolrClient(
+        base_url="http://example.com/solr", collection="test_collection"
+    ) as client:
+        await client.search(query="*:*")
+        http_client = client._http_client
+        await client.search(query="test")
+        assert client._http_client is http_client
+
+    assert route.call_count == 2
+    assert http_client.is_closed
+
+
+@respx.mock
+async def test_solr_client_caches_identical_searches():
+    """Test that identical searches are answered from the response cache"""
+    route = respx.get(SELECT_URL).mock(
+        return_value=httpx.Response(
+            200,
+            content=SEARCH_RESULT_BYTES,
+            headers={"Content-Type": "application/json"},
+        )
+    )
 
-@pytest.mark.asyncio
-async def test_search_tool_with_facets(mock_context):
+    async with SolrClient(
+        base_url="http://example.com/solr",
+        collection="test_collection",
+        search_cache_ttl=60,
+    ) as client:
+        result1 = await client.search(query="test", rows=5)
+        result2 = await client.search(query="test", rows=5)
+        # Different parameters must not be served from the cache
+        await client.search(query="test", rows=10)
+
+    assert result1 == result2
+    assert result1 is not result2
+    assert route.call_count == 2
+    assert client._http_client is None
+
+
+@respx.mock
+async def test_solr_client_search_cache_disabled():
+    """Test that a search cache TTL of 0 (the default) always queries Solr"""
+    route = respx.get(SELECT_URL).mock(
+        return_value=httpx.Response(
+            200,
+            content=SEARCH_RESULT_BYTES,
+            headers={"Content-Type": "application/json"},
+        )
+    )
+
+    async with SolrClient(
+        base_url="http://example.com/solr",
+        collection="test_collection",
+        search_cache_ttl=0,
+    ) as client:
+        await client.search(query="test", rows=5)
+        await client.search(query="test", rows=5)
+        assert not client._search_cache
+
+    assert route.call_count == 2
+
+
+async def test_search_tool_with_facets(mock_context, mock_solr_client):
     """Test the search tool with facet_fields parameter"""
     # Setup mock to return facet counts
     faceted_result = {
@@ -220,9 +317,7 @@ async def test_search_tool_with_facets(mock_context):
             }
         },
     }
-    mock_context.request_context.lifespan_context.solr_client.search.return_value = (
-        faceted_result
-    )
+    mock_solr_client.search_result = faceted_result
 
     # Call the tool with facet_fields
     result = await search(
@@ -250,53 +345,47 @@ async def test_search_tool_with_facets(mock_context):
     assert mock_context.info.called
 
 
-@pytest.mark.asyncio
+@respx.mock
 async def test_solr_client_search_with_facets():
     """Test SolrClient search method with facet_fields"""
-    mock_response = AsyncMock()
-    mock_response.raise_for_status = AsyncMock()
-    mock_response.json = AsyncMock(
-        return_value={
-            "responseHeader": {"status": 0},
-            "response": {
-                "numFound": 10,
-                "start": 0,
-                "docs": [
-                    {"id": "doc1", "title": "First Document", "category": "technology"},
-                    {
-                        "id": "doc2",
-                        "title": "Second Document",
-                        "category": "programming",
-                    },
-                ],
-            },
-            "facet_counts": {
-                "facet_fields": {
-                    "category": [
-                        "programming",
-                        3,
-                        "technology",
-                        3,
-                        "database",
-                        1,
-                        "devops",
-                        1,
-                    ]
-                }
+    respx.get(SELECT_URL).mock(
+        return_value=httpx.Response(
+            200,
+            json={
+                "responseHeader": {"status": 0},
+                "response": {
+                    "numFound": 10,
+                    "start": 0,
+                    "docs": [
+                        {"id": "doc1", "title": "First Document", "category": "technology"},
+                        {
+                            "id": "doc2",
+                            "title": "Second Document",
+                            "category": "programming",
+                        },
+                    ],
+                },
+                "facet_counts": {
+                    "facet_fields": {
+                        "category": [
+                            "programming",
+                            3,
+                            "technology",
+                            3,
+                            "database",
+                            1,
+                            "devops",
+                            1,
+                        ]
+                    }
+                },
             },
-        }
+        )
     )
 
-    async def get(*args, **kwargs):
-        return mock_response
-
-    mock_client = AsyncMock()
-    mock_client.__aenter__.return_value.get = get
-
-    with patch("httpx.AsyncClient", return_value=mock_client):
-        client = SolrClient(
-            base_url="http://example.com/solr", collection="test_collection"
-        )
+    async with SolrClient(
+        base_url="http://example.com/solr", collection="test_collection"
+    ) as client:
         result = await client.search(query="*:*", facet_fields=["category"])
 
         # Verify response structure
@@ -316,8 +405,7 @@ async def test_solr_client_search_with_facets():
         assert category_facets[category_facets.index("technology") + 1] == 3
 
 
-@pytest.mark.asyncio
-async def test_search_tool_with_highlighting(mock_context):
+async def test_search_tool_with_highlighting(mock_context, mock_solr_client):
     """Test the search tool with highlight_fields parameter"""
     # Setup mock to return highlighting
     highlighted_result = {
@@ -351,9 +439,7 @@ async def test_search_tool_with_highlighting(mock_context):
             },
         },
     }
-    mock_context.request_context.lifespan_context.solr_client.search.return_value = (
-        highlighted_result
-    )
+    mock_solr_client.search_result = highlighted_result
 
     # Call the tool with highlight_fields
     result = await search(
@@ -383,8 +469,7 @@ async def test_search_tool_with_highlighting(mock_context):
     assert mock_context.info.called
 
 
-@pytest.mark.asyncio
-async def test_search_tool_with_edismax(mock_context):
+async def test_search_tool_with_edismax(mock_context, mock_solr_client):
     """Test the search tool uses edismax for text queries"""
     # Setup mock to capture the search call
     edismax_result = {
@@ -401,9 +486,7 @@ async def test_search_tool_with_edismax(mock_context):
             ],
         },
     }
-    mock_context.request_context.lifespan_context.solr_client.search.return_value = (
-        edismax_result
-    )
+    mock_solr_client.search_result = edismax_result
 
     # Call the tool with a simple text query (no field specifier)
     result = await search(
@@ -423,63 +506,56 @@ async def test_search_tool_with_edismax(mock_context):
     assert result["response"]["docs"][0]["id"] == "doc2"
 
     # Verify solr_client.search was called with the query
-    mock_context.request_context.lifespan_context.solr_client.search.assert_called_once()
-    call_args = (
-        mock_context.request_context.lifespan_context.solr_client.search.call_args
-    )
-    assert call_args[1]["query"] == "machine learning"
+    assert len(mock_solr_client.calls) == 1
+    method, _, kwargs = mock_solr_client.calls[-1]
+    assert method == "search"
+    assert kwargs["query"] == "machine learning"
 
     # Verify ctx.info was called
     assert mock_context.info.called
 
 
-@pytest.mark.asyncio
+@respx.mock
 async def test_solr_client_search_with_highlighting():
     """Test SolrClient search method with highlight_fields"""
-    mock_response = AsyncMock()
-    mock_response.raise_for_status = AsyncMock()
-    mock_response.json = AsyncMock(
-        return_value={
-            "responseHeader": {"status": 0},
-            "response": {
-                "numFound": 2,
-                "start": 0,
-                "docs": [
-                    {
-                        "id": "doc1",
-                        "title": "Apache Solr Tutorial",
-                        "content": "Learn about Apache Solr search engine",
+    respx.get(SELECT_URL).mock(
+        return_value=httpx.Response(
+            200,
+            json={
+                "responseHeader": {"status": 0},
+                "response": {
+                    "numFound": 2,
+                    "start": 0,
+                    "docs": [
+                        {
+                            "id": "doc1",
+                            "title": "Apache Solr Tutorial",
+                            "content": "Learn about Apache Solr search engine",
+                        },
+                        {
+                            "id": "doc2",
+                            "title": "Solr Configuration",
+                            "content": "How to configure your Solr instance",
+                        },
+                    ],
+                },
+                "highlighting": {
+                    "doc1": {
+                        "title": ["Apache <em>Solr</em> Tutorial"],
+                        "content": ["Learn about Apache <em>Solr</em> search engine"],
                     },
-                    {
-                        "id": "doc2",
-                        "title": "Solr Configuration",
-                        "content": "How to configure your Solr instance",
+                    "doc2": {
+                        "title": ["<em>Solr</em> Configuration"],
+                        "content": ["How to configure your <em>Solr</em> instance"],
                     },
-                ],
-            },
-            "highlighting": {
-                "doc1": {
-                    "title": ["Apache <em>Solr</em> Tutorial"],
-                    "content": ["Learn about Apache <em>Solr</em> search engine"],
-                },
-                "doc2": {
-                    "title": ["<em>Solr</em> Configuration"],
-                    "content": ["How to configure your <em>Solr</em> instance"],
                 },
             },
-        }
+        )
     )
 
-    async def get(*args, **kwargs):
-        return mock_response
-
-    mock_client = AsyncMock()
-    mock_client.__aenter__.return_value.get = get
-
-    with patch("httpx.AsyncClient", return_value=mock_client):
-        client = SolrClient(
-            base_url="http://example.com/solr", collection="test_collection"
-        )
+    async with SolrClient(
+        base_url="http://example.com/solr", collection="test_collection"
+    ) as client:
         result = await client.search(
             query="Solr", highlight_fields=["title", "content"]
         )
@@ -506,3 +582,46 @@ async def test_solr_client_search_with_highlighting():
         assert "content" in doc2_highlights
         assert "<em>Solr</em>" in doc2_highlights["title"][0]
         assert "<em>Solr</em>" in doc2_highlights["content"][0]
+
+
+@respx.mock
+async def test_solr_connection_ping_is_cached():
+    """Test that concurrent and repeated Solr pings share one cached result"""
+    route = respx.get("http://example.com/solr/test_collection/admin/ping").mock(
+        return_value=httpx.Response(200, json={"status": "OK"})
+    )
+
+    async with SolrClient(
+        base_url="http://example.com/solr", collection="test_collection"
+    ) as client:
+        with patch.dict(mcp_server._ping_cache, clear=True):
+            results = await asyncio.gather(
+                *(mcp_server.test_solr_connection(client) for _ in range(5))
+            )
+            assert results == [True] * 5
+            assert await mcp_server.test_solr_connection(client) is True
+
+    # Only the first ping should have reached Solr
+    assert route.call_count == 1
+
+
+@respx.mock
+async def test_solr_connection_ping_cache_per_client():
+    """Test that the cached ping result of one Solr client is not reused for another"""
+    respx.get("http://example.com/solr/test_collection/admin/ping").mock(
+        return_value=httpx.Response(200, json={"status": "OK"})
+    )
+    respx.get("http://example.com/solr/other_collection/admin/ping").mock(
+        return_value=httpx.Response(404)
+    )
+
+    client = SolrClient(
+        base_url="http://example.com/solr", collection="test_collection"
+    )
+    other_client = SolrClient(
+        base_url="http://example.com/solr", collection="other_collection"
+    )
+    async with client, other_client:
+        with patch.dict(mcp_server._ping_cache, clear=True):
+            assert await mcp_server.test_solr_connection(client) is True
+            assert await mcp_server.test_solr_connection(other_client) is False
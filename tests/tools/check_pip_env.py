@@ -8,26 +8,11 @@ um Probleme mit virtuellen Umgebungen zu diagnostizieren.
 import os
 import sys
 import site
+import shutil
 import subprocess
+from importlib.metadata import PackageNotFoundError, version
 from pathlib import Path
 
-def run_command(cmd):
-    """
-    Führt einen Shell-Befehl aus und gibt die Ausgabe zurück.
-    
-    Args:
-        cmd (str): Der auszuführende Befehl.
-    
-    Returns:
-        str: Die Ausgabe des Befehls.
-    """
-    try:
-        result = subprocess.run(cmd, shell=True, check=True, 
-                              capture_output=True, text=True)
-        return result.stdout.strip()
-    except subprocess.CalledProcessError as e:
-        return f"Fehler: {e.stderr.strip()}"
-
 def check_environment():
     """
     Überprüft die Python- und pip-Umgebungsdetails.
@@ -43,12 +28,28 @@ def check_environment():
     venv = os.environ.get("VIRTUAL_ENV")
     print(f"Aktive virtuelle Umgebung: {venv or 'Keine'}")
     
-    # pip-Informationen
-    pip_location = run_command("which pip")
-    pip_version = run_command("pip --version")
+    # pip im PATH: Version über das gefundene pip selbst ermitteln (ohne Shell),
+    # da es zu einer anderen Umgebung gehören kann als dieser Interpreter
+    pip_location = shutil.which("pip")
+    path_pip_version = None
+    if pip_location:
+        try:
+            result = subprocess.run(
+                [pip_location, "--version"], check=True, capture_output=True, text=True
+            )
+            path_pip_version = result.stdout.strip()
+        except (OSError, subprocess.CalledProcessError) as e:
+            path_pip_version = f"Fehler: {e}"
+    
+    # pip des laufenden Interpreters
+    try:
+        interpreter_pip_version = version("pip")
+    except PackageNotFoundError:
+        interpreter_pip_version = None
     
-    print(f"pip-Pfad: {pip_location}")
-    print(f"pip-Version: {pip_version}")
+    print(f"pip-Pfad (PATH): {pip_location or 'Nicht gefunden'}")
+    print(f"pip-Version (PATH): {path_pip_version or 'Nicht verfügbar'}")
+    print(f"pip-Version (dieser Interpreter): {interpreter_pip_version or 'Nicht installiert'}")
     
     # sys.path überprüfen
     print("\nPython-Suchpfade (sys.path):")
@@ -3,9 +3,11 @@
 This script attempts to discover the correct MCP client module structure.
 It will try different import paths and report which ones are available.
 """
-import sys
 import importlib
+from functools import lru_cache
+from itertools import islice
 
+@lru_cache(maxsize=None)
 def test_import(module_path):
     """Test if a module can be imported and return details about it."""
     try:
@@ -20,13 +22,16 @@ def test_import(module_path):
             print(f"  ✗ No Client class in {module_path}")
             
         # Print available attributes
-        attrs = [attr for attr in dir(module) if not attr.startswith("_")]
-        if attrs:
-            print(f"  Available attributes: {', '.join(attrs[:10])}")
-            if len(attrs) > 10:
-                print(f"  ... and {len(attrs) - 10} more")
+        attrs = (attr for attr in dir(module) if not attr.startswith("_"))
+        first_attrs = list(islice(attrs, 10))
+        if first_attrs:
+            print(f"  Available attributes: {', '.join(first_attrs)}")
+            remaining = sum(1 for _ in attrs)
+            if remaining:
+                print(f"  ... and {remaining} more")
         return False
-    except ImportError as e:
+    except Exception as e:
+        # Not only ImportError: a candidate may fail with any error at import time
         print(f"✗ Import failed for: {module_path}")
         print(f"  Error: {e}")
         return False
@@ -45,12 +50,13 @@ potential_paths = [
 
 print("Attempting to discover MCP client module structure...\n")
 
-# Try searching for modules
+# Try the candidates in order and stop importing at the first one with a Client class
 success = False
 for path in potential_paths:
     if test_import(path):
         success = True
         print(f"\nRecommendation: Try 'from {path} import Client'\n")
+        break
 
 # If we found the base module but not the client, check its contents
 if not success and test_import("mcp"):
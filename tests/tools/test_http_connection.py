@@ -5,9 +5,11 @@ This bypasses the MCP client library and tests raw HTTP connections.
 """
 import requests
 import sys
-import json
 import socket
-from urllib.parse import urljoin
+from functools import lru_cache
+from urllib.parse import quote, urljoin
+
+import orjson
 
 def check_socket_connection(host='localhost', port=8765):
     """
@@ -40,21 +42,19 @@ def check_socket_connection(host='localhost', port=8765):
         print(f"❌ Socket connection error: {str(e)}")
         return False
 
-def test_mcp_tool_endpoint(base_url='http://localhost:8765', tool_name='search'):
+def test_mcp_tool_endpoint(url='http://localhost:8765/tool/search'):
     """
     Test a specific MCP tool endpoint using direct HTTP POST.
     
     Args:
-        base_url (str): Base URL of the MCP server
-        tool_name (str): Name of the tool to test
+        url (str): Full URL of the MCP tool endpoint
     """
-    url = urljoin(base_url, f'/tool/{tool_name}')
     headers = {'Content-Type': 'application/json'}
     payload = {'query': '*:*', 'rows': 5}
     
     print(f"Testing HTTP POST to {url}...")
     try:
-        response = requests.post(url, headers=headers, data=json.dumps(payload), timeout=5)
+        response = requests.post(url, headers=headers, data=orjson.dumps(payload), timeout=5)
         print(f"Status Code: {response.status_code}")
         print(f"Response headers: {response.headers}")
         print(f"Response body: {response.text[:500]}...")  # First 500 chars
@@ -66,16 +66,20 @@ def test_mcp_tool_endpoint(base_url='http://localhost:8765', tool_name='search')
         print(f"❌ Error during request: {str(e)}")
         return None
 
-def test_mcp_resource_endpoint(base_url='http://localhost:8765'):
+@lru_cache(maxsize=256)
+def _resource_path(query):
+    """Return the URL-encoded resource path for solr://search/<query>."""
+    return "/resource/" + quote("solr://search/" + query, safe="")
+
+def test_mcp_resource_endpoint(base_url='http://localhost:8765', query='*:*'):
     """
     Test an MCP resource endpoint using direct HTTP GET.
     
     Args:
         base_url (str): Base URL of the MCP server
+        query (str): Solr query for the solr://search resource
     """
-    # URL-encoded resource path for solr://search/*:*
-    url = urljoin(base_url, '/resource/solr%3A%2F%2Fsearch%2F%2A%3A%2A')
-    
+    url = base_url.rstrip("/") + _resource_path(query)
     print(f"Testing HTTP GET to {url}...")
     try:
         response = requests.get(url, timeout=5)
@@ -99,7 +103,7 @@ def check_server_info(base_url='http://localhost:8765'):
         response = requests.get(url, timeout=5)
         print(f"Status Code: {response.status_code}")
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             print(f"Server name: {data.get('name')}")
             print(f"Server version: {data.get('version')}")
             print(f"Available tools: {', '.join(data.get('tools', []))}")
@@ -121,6 +125,9 @@ def main():
         if '://' not in base_url:
             base_url = f'http://{base_url}'
     
+    # Build the tool endpoint URL once instead of on every request
+    tool_url = urljoin(base_url, '/tool/search')
+    
     print(f"Testing MCP server at: {base_url}")
     print("=" * 50)
     
@@ -142,7 +149,7 @@ def main():
         return
     
     # Test the tool endpoint
-    test_mcp_tool_endpoint(base_url)
+    test_mcp_tool_endpoint(tool_url)
     print("=" * 50)
     
     # Test the resource endpoint